@@ -1,90 +1,112 @@
-import json
-from typing import List, Dict
-import os
-import requests
-from dotenv import load_dotenv
-from itertools import islice
-from functools import lru_cache
-import time
+import logging
+from typing import List, Dict, Optional
+from app.keyword_matcher import KeywordMatcher
+from app.data_files import load_tag_hierarchy
+from app.tag_rules import load_tag_rules
+from app.image_headers import ImageInfo
 
-# Load environment variables from the root directory
-load_dotenv(override=True)
+logger = logging.getLogger(__name__)
 
-# Hugging Face API configuration
-HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
-if not HUGGINGFACE_API_KEY:
-    raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
+# Asset type keywords, in order of precedence
+ASSET_TYPE_KEYWORDS = {
+    'baseplate': ['baseplate', 'base plate', 'base-plate'],
+    'dealer-logo': ['dealer logo', 'dealerlogos', 'dealer-logos'],
+    'award-logo': ['award logo', 'awardlogos', 'award-logos', 'award'],
+    'energy-label': ['energy label', 'energylabel', 'energy-label'],
+    'car-logo': ['car logo', 'carlogo', 'car-logos', 'brand logo', 'brandlogos'],
+    'qr-code': ['qr', 'qr-code', 'qrcode', 'qr code'],
+    'social-logo': ['social logo', 'sociallogos', 'social-logos', 'social media logo'],
+    'warranty-logo': ['warranty logo', 'warrantylogos', 'warranty-logos', 'warranty'],
+    'packshot': ['packshot', 'packshots', 'pack shot', 'pack-shot'],
+    'additional-logo': ['additional logo', 'additionallogos', 'additional-logos'],
+    'customer-promise': ['customer promise', 'customerpromise', 'customer-promise']
+}
 
-API_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
+# Language keywords, in order of precedence
+ASSET_LANGUAGE_KEYWORDS = {
+    'finnish': ['finnish', 'suomi', 'fi'],
+    'swedish': ['swedish', 'ruotsi', 'sv'],
+    'norwegian': ['norwegian', 'norja', 'no'],
+    'danish': ['danish', 'tanska', 'dk'],
+    'estonian': ['estonian', 'viro', 'et'],
+    'latvian': ['latvian', 'latvia', 'lv'],
+    'lithuanian': ['lithuanian', 'liettua', 'lt'],
+    'russian': ['russian', 'venäjä', 'ru']
+}
 
-# Cache for API responses
-api_cache = {}
+def build_asset_matcher() -> KeywordMatcher:
+    """Compile every asset keyword table into one single-pass matcher."""
+    tag_hierarchy = load_tag_hierarchy()
+    vehicle_models = tag_hierarchy['filter']['subcategories']['vehicle']
+    matcher = KeywordMatcher(load_tag_rules().fuzzy_ignore)
+    matcher.add_group('type', ASSET_TYPE_KEYWORDS, fuzzy=True)
+    matcher.add_group('language', ASSET_LANGUAGE_KEYWORDS, fuzzy=True)
+    matcher.add_group('vehicle', {model: [model] for model in vehicle_models}, fuzzy=True)
+    return matcher.compile()
+
+ASSET_MATCHER = build_asset_matcher()
+
+# Uploaded file formats (see app/image_headers.py) -> asset type; PDFs have no type of their own
+FORMAT_TYPES = {
+    'png': 'image',
+    'jpeg': 'image',
+    'gif': 'image',
+    'svg': 'image'
+}
 
-@lru_cache(maxsize=1)
-def load_tag_hierarchy():
-    with open("tag_hierarchy.json", "r") as f:
-        return json.load(f)
+# Images are often exported at 2x or 3x their placement size
+IMAGE_SCALES = (1, 2, 3)
+MM_PER_POINT = 25.4 / 72
+# Print sizes are in millimetres; PDF page sizes may be off by rounding
+PAGE_SIZE_TOLERANCE_MM = 2
 
-def batch(iterable, size):
-    """Split an iterable into batches of specified size."""
-    iterator = iter(iterable)
-    while batch := list(islice(iterator, size)):
-        yield batch
+def build_size_tables():
+    """Pixel sizes ('300x250px') and print sizes in mm ('140x180', A4) of the system/size tags."""
+    pixel_sizes, page_sizes = {}, {'a4': (210, 297)}
+    for size in load_tag_hierarchy()['system']['size']:
+        width, _, height = size.removesuffix('px').partition('x')
+        if width.isdigit() and height.isdigit():
+            target = pixel_sizes if size.endswith('px') else page_sizes
+            target[size] = (int(width), int(height))
+    return {dimensions: size for size, dimensions in pixel_sizes.items()}, page_sizes
+
+PIXEL_SIZES, PAGE_SIZES = build_size_tables()
+
+def size_from_header(info: ImageInfo) -> Optional[str]:
+    """The system/size tag matching an uploaded file's dimensions, if any."""
+    if not info.width or not info.height:
+        return None
+    if info.unit == 'pt':
+        page = sorted((info.width * MM_PER_POINT, info.height * MM_PER_POINT))
+        for size, dimensions in PAGE_SIZES.items():
+            if all(abs(a - b) <= PAGE_SIZE_TOLERANCE_MM for a, b in zip(page, sorted(dimensions))):
+                return f"system/size/{size}"
+        return None
+    for scale in IMAGE_SCALES:
+        if info.width % scale == 0 and info.height % scale == 0:
+            size = PIXEL_SIZES.get((info.width // scale, info.height // scale))
+            if size:
+                return f"system/size/{size}"
+    return None
 
 def get_relevant_asset_tags(description: str) -> List[str]:
     """Get only the most relevant tags based on the description."""
-    tag_hierarchy = load_tag_hierarchy()
+    matches = ASSET_MATCHER.scan(description)
     relevant_tags = []
-    description_lower = description.lower()
-    
-    # Add asset type tags
-    asset_types = {
-        'baseplate': ['baseplate', 'base plate', 'base-plate'],
-        'dealer-logo': ['dealer logo', 'dealerlogos', 'dealer-logos'],
-        'award-logo': ['award logo', 'awardlogos', 'award-logos', 'award'],
-        'energy-label': ['energy label', 'energylabel', 'energy-label'],
-        'car-logo': ['car logo', 'carlogo', 'car-logos', 'brand logo', 'brandlogos'],
-        'qr-code': ['qr', 'qr-code', 'qrcode', 'qr code'],
-        'social-logo': ['social logo', 'sociallogos', 'social-logos', 'social media logo'],
-        'warranty-logo': ['warranty logo', 'warrantylogos', 'warranty-logos', 'warranty'],
-        'packshot': ['packshot', 'packshots', 'pack shot', 'pack-shot'],
-        'additional-logo': ['additional logo', 'additionallogos', 'additional-logos'],
-        'customer-promise': ['customer promise', 'customerpromise', 'customer-promise']
-    }
     
-    # Check for each asset type
-    for asset_type, keywords in asset_types.items():
-        if any(keyword in description_lower for keyword in keywords):
-            relevant_tags.append(f"type/{asset_type}")
-            break  # Only add the first matching asset type
+    # Only add the first matching asset type
+    asset_type = matches.first('type')
+    if asset_type:
+        relevant_tags.append(f"type/{asset_type}")
     
-    # Add language tags
-    if any(lang in description_lower for lang in ['finnish', 'suomi', 'fi']):
-        relevant_tags.append("language/finnish")
-    elif any(lang in description_lower for lang in ['swedish', 'ruotsi', 'sv']):
-        relevant_tags.append("language/swedish")
-    elif any(lang in description_lower for lang in ['norwegian', 'norja', 'no']):
-        relevant_tags.append("language/norwegian")
-    elif any(lang in description_lower for lang in ['danish', 'tanska', 'dk']):
-        relevant_tags.append("language/danish")
-    elif any(lang in description_lower for lang in ['estonian', 'viro', 'et']):
-        relevant_tags.append("language/estonian")
-    elif any(lang in description_lower for lang in ['latvian', 'latvia', 'lv']):
-        relevant_tags.append("language/latvian")
-    elif any(lang in description_lower for lang in ['lithuanian', 'liettua', 'lt']):
-        relevant_tags.append("language/lithuanian")
-    elif any(lang in description_lower for lang in ['russian', 'venäjä', 'ru']):
-        relevant_tags.append("language/russian")
-    else:
-        relevant_tags.append("language/english")  # Default to English if no language is detected
+    # Add language tags, defaulting to English if no language is detected
+    language = matches.first('language') or 'english'
+    relevant_tags.append(f"language/{language}")
     
     # Add vehicle filter tags if present
-    vehicle_models = tag_hierarchy['filter']['subcategories']['vehicle']
-    for model in vehicle_models:
-        model_lower = model.lower()
-        if model_lower in description_lower:
-            relevant_tags.append(f"filter/vehicle/{model}")
-            break
+    model = matches.first('vehicle')
+    if model:
+        relevant_tags.append(f"filter/vehicle/{model}")
     
     return relevant_tags
 
@@ -129,8 +151,8 @@ def suggest_asset_tags(description: str) -> Dict:
     except Exception as e:
         error_message = str(e)
         error_type = type(e).__name__
-        print(f"Error getting asset suggestions: {error_message}")
-        print(f"Error type: {error_type}")
+        logger.exception("Error getting asset suggestions, using fallback suggestions",
+                         extra={"error": error_message, "error_type": error_type})
         
         # Create a fallback response
         fallback_suggestions = {
@@ -158,5 +180,22 @@ def suggest_asset_tags(description: str) -> Dict:
             }
         }
         
-        print("Using fallback suggestions due to API error")
-        return fallback_suggestions 
\ No newline at end of file
+        return fallback_suggestions
+
+def suggest_upload_tags(info: Optional[ImageInfo], description: str = "") -> Dict:
+    """Asset suggestions for an uploaded file: type and size from its header, the rest from the description."""
+    result = suggest_asset_tags(description)
+    if info is None or result.get("is_fallback"):
+        return result
+    
+    suggestions = result["suggestions"]
+    # A type from the description (baseplate, packshot, ...) says more than the file format
+    format_type = FORMAT_TYPES.get(info.format)
+    if format_type and not any(s["category"] == "type" for s in suggestions):
+        suggestions.insert(0, {"category": "type", "suggested_tags": [f"type/{format_type}"], "confidence": 0.95})
+    
+    size = size_from_header(info)
+    if size:
+        # Read from the file itself rather than guessed
+        suggestions.append({"category": "system/size", "suggested_tags": [size], "confidence": 1.0})
+    return result
@@ -0,0 +1,126 @@
+"""Streaming helpers for the batch suggestion endpoint.
+
+Items are read lazily (NDJSON lines or an already parsed list), processed with
+a bounded number of coroutines in flight and emitted one NDJSON line at a time,
+so memory stays flat regardless of batch size.
+"""
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import orjson
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.metrics import CLIENT_DISCONNECTS
+
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 64
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streams NDJSON lines while the request body may still be read.
+
+    StreamingResponse watches for disconnects by consuming receive(), which
+    would swallow the body chunks of a streamed NDJSON upload. Here receive()
+    is only watched once `body_read` is set; a disconnect then cancels the
+    stream and with it every pending batch item.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, content, body_read: asyncio.Event, endpoint: str, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+        self.endpoint = endpoint
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await cancel_on_disconnect(receive, self.stream_response(send), self.endpoint, self.body_read)
+        except ClientDisconnected:
+            return
+        except ClientDisconnect:
+            # The client went away in the middle of the upload
+            CLIENT_DISCONNECTS.inc(self.endpoint)
+            return
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes], body_read: Optional[asyncio.Event] = None) -> AsyncIterator[Any]:
+    """Parse an NDJSON byte stream line by line. Invalid lines yield the error.
+
+    body_read, if given, is set once the stream has been fully consumed.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if body_read is not None:
+        body_read.set()
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return orjson.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def _aiter(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def run_batch(items: Union[Iterable[Any], AsyncIterable[Any]],
+                    handler: Callable[[Any], Awaitable[Dict]],
+                    concurrency: int = DEFAULT_CONCURRENCY,
+                    ordered: bool = True) -> AsyncIterator[Tuple[int, Dict]]:
+    """Run `handler` over items with at most `concurrency` calls in flight.
+
+    Yields (index, result) pairs in input order, or in completion order when
+    `ordered` is False. Only the in-flight window is ever held in memory, and
+    `handler` is expected to turn per-item failures into result dicts.
+    """
+    # (index, task) pairs in input order
+    in_flight: deque = deque()
+    index = 0
+    try:
+        async for item in _aiter(items):
+            in_flight.append((index, asyncio.ensure_future(handler(item))))
+            index += 1
+            if len(in_flight) >= concurrency:
+                async for done in _drain(in_flight, ordered):
+                    yield done
+        while in_flight:
+            async for done in _drain(in_flight, ordered):
+                yield done
+    finally:
+        # The client went away or the generator was closed: stop outstanding work
+        for _, task in in_flight:
+            task.cancel()
+
+
+async def _drain(in_flight: deque, ordered: bool) -> AsyncIterator[Tuple[int, Dict]]:
+    """Wait for at least one slot to free up and yield what finished."""
+    if ordered:
+        await asyncio.wait([in_flight[0][1]])
+        # Emit every finished task at the head of the input order
+        while in_flight and in_flight[0][1].done():
+            index, task = in_flight.popleft()
+            yield index, task.result()
+    else:
+        await asyncio.wait([task for _, task in in_flight], return_when=asyncio.FIRST_COMPLETED)
+        for entry in [entry for entry in in_flight if entry[1].done()]:
+            in_flight.remove(entry)
+            yield entry[0], entry[1].result()
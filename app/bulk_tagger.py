@@ -0,0 +1,214 @@
+"""Offline bulk tagging of asset filenames.
+
+Walks a directory tree, or reads a manifest, lazily and tags every filename
+with parse_filename/suggest_tags_from_filename on a process pool. Results are
+written incrementally, in input order, to JSONL or CSV, and a checkpoint is
+saved after every chunk so an interrupted run can be resumed.
+
+Usage (from the repository root):
+
+    python -m app.bulk_tagger /mnt/assets -o tags.jsonl
+    python -m app.bulk_tagger manifest.jsonl -o tags.csv --workers 16
+    python -m app.bulk_tagger /mnt/assets -o tags.jsonl --resume
+
+A manifest is either a text file with one path per line, or a JSONL file
+(for example a requests.jsonl capture) whose objects carry a "filename" or
+"path" field. Lines without one are skipped.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from app.filename_parser import FIELDS, parse_filename, parse_filenames, suggest_tags_from_filename, suggestions_from_parsed
+
+CSV_FIELDS = ["path", "filename", "fiscal_year", "quarter", "project_type", "language",
+              "vehicles", "media_type", "dimensions", "version", "tags", "error"]
+
+
+def iter_directory(root: str, extensions: Optional[List[str]] = None) -> Iterator[str]:
+    """Yield file paths under root in a stable (sorted) order, one directory at a time."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Warning: cannot read {directory}: {e}", file=sys.stderr)
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif not extensions or os.path.splitext(entry.name)[1].lower() in extensions:
+                yield entry.path
+        # Reversed so the stack visits subdirectories in sorted order
+        stack.extend(reversed(subdirectories))
+
+
+def iter_manifest(path: str) -> Iterator[str]:
+    """Yield paths from a plain-text or JSONL manifest, one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                value = record.get("filename") or record.get("path")
+                if value:
+                    yield value
+            else:
+                yield line
+
+
+def tag_file(path: str) -> Dict:
+    """Tag a single path. Malformed names are reported instead of raised."""
+    filename = os.path.basename(path)
+    record = {"path": path, "filename": filename}
+    try:
+        record["parsed"] = parse_filename(filename)
+        record["suggestions"] = suggest_tags_from_filename(filename)["suggestions"]
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def tag_chunk(paths: List[str]) -> List[Dict]:
+    """Worker entry point: tag a chunk of paths with one batch parse."""
+    filenames = [os.path.basename(path) for path in paths]
+    columns = parse_filenames(filenames)
+    records = []
+    for path, filename, values in zip(paths, filenames, zip(*(columns[field] for field in FIELDS))):
+        parsed = dict(zip(FIELDS, values))
+        records.append({
+            "path": path,
+            "filename": filename,
+            "parsed": parsed,
+            "suggestions": suggestions_from_parsed(parsed)["suggestions"]
+        })
+    return records
+
+
+def csv_row(record: Dict) -> Dict:
+    parsed = record.get("parsed") or {}
+    tags = [tag for suggestion in record.get("suggestions", []) for tag in suggestion["suggested_tags"]]
+    row = {field: parsed.get(field) for field in CSV_FIELDS if field in parsed}
+    row.update({
+        "path": record["path"],
+        "filename": record["filename"],
+        "vehicles": ";".join(parsed.get("vehicles") or []),
+        "tags": ";".join(tags),
+        "error": record.get("error", "")
+    })
+    return row
+
+
+class Checkpoint:
+    """Number of input items already written, and the output size at that point."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"processed": 0, "output_bytes": 0}
+
+    def save(self, processed: int, output_bytes: int) -> None:
+        # Write-then-rename so a crash never leaves a torn checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"processed": processed, "output_bytes": output_bytes}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def iter_chunks(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def run(source: str, output: str, output_format: str = "jsonl", workers: Optional[int] = None,
+        chunk_size: int = 1000, checkpoint_path: Optional[str] = None, resume: bool = False,
+        extensions: Optional[List[str]] = None) -> int:
+    """Tag every file of `source` into `output`. Returns the number of items processed."""
+    workers = workers or os.cpu_count() or 1
+    checkpoint = Checkpoint(checkpoint_path or f"{output}.checkpoint")
+    state = checkpoint.load() if resume else {"processed": 0, "output_bytes": 0}
+    processed = state["processed"]
+
+    if os.path.isdir(source):
+        items = iter_directory(source, extensions)
+    else:
+        items = iter_manifest(source)
+    # Input order is deterministic, so resuming means skipping what was written
+    items = islice(items, processed, None)
+
+    mode = "r+" if resume and os.path.exists(output) else "w"
+    with open(output, mode, newline="", encoding="utf-8") as out:
+        # Drop anything written after the last checkpoint
+        out.seek(state["output_bytes"] if mode == "r+" else 0)
+        out.truncate()
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS) if output_format == "csv" else None
+        if writer and out.tell() == 0:
+            writer.writeheader()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of chunks in flight, collected in submit order
+            in_flight = deque()
+            chunks = iter_chunks(items, chunk_size)
+            for chunk in chunks:
+                in_flight.append(pool.submit(tag_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    processed += _write_chunk(in_flight.popleft().result(), out, writer)
+                    checkpoint.save(processed, out.tell())
+            while in_flight:
+                processed += _write_chunk(in_flight.popleft().result(), out, writer)
+                checkpoint.save(processed, out.tell())
+    return processed
+
+
+def _write_chunk(records: List[Dict], out, writer) -> int:
+    for record in records:
+        if writer:
+            writer.writerow(csv_row(record))
+        else:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tag asset filenames in bulk.")
+    parser.add_argument("source", help="directory to walk, or a manifest file (text or JSONL)")
+    parser.add_argument("-o", "--output", required=True, help="output file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="output format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="filenames per work unit")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--ext", action="append", help="only tag files with this extension (repeatable)")
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    extensions = [ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in args.ext or []]
+    processed = run(args.source, args.output, output_format, args.workers, args.chunk_size,
+                    args.checkpoint, args.resume, extensions)
+    print(f"Tagged {processed} files into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
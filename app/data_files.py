@@ -0,0 +1,40 @@
+"""Locations and loaders of the JSON data files.
+
+Paths are resolved relative to this package, so the app works from any
+working directory. Each file is parsed once per process; with the preloading
+launcher (app/serve.py) that is once in the parent, shared by every worker.
+"""
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(APP_DIR)
+
+TAG_HIERARCHY_PATH = os.path.join(APP_DIR, "tag_hierarchy.json")
+TAG_RULES_PATH = os.path.join(APP_DIR, "tag_rules.json")
+CAR_MODELS_PATH = os.path.join(ROOT_DIR, "car_models.json")
+
+
+def read_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def load_tag_hierarchy() -> Dict:
+    """The tag hierarchy, shared by all modules: treat it as read-only."""
+    return read_json(TAG_HIERARCHY_PATH)
+
+
+@lru_cache(maxsize=1)
+def load_car_models() -> Dict:
+    try:
+        return read_json(CAR_MODELS_PATH)
+    except FileNotFoundError:
+        logger.warning("car_models.json not found. Using empty car models list.")
+        return {}
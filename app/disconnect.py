@@ -0,0 +1,52 @@
+"""Cancel request work when the client goes away.
+
+Once the request body has been read, the next ASGI receive() only returns
+when the client disconnects. Racing the handler against it lets abandoned
+requests cancel their upstream inference calls instead of running them to
+completion.
+"""
+import asyncio
+from typing import Any, Awaitable, Optional
+
+from starlette.types import Receive
+
+from app.metrics import CLIENT_DISCONNECTS
+
+
+class ClientDisconnected(Exception):
+    """The client disconnected before the response was ready."""
+
+
+async def wait_for_disconnect(receive: Receive, body_read: Optional[asyncio.Event] = None) -> None:
+    """Return once the client has disconnected.
+
+    body_read, if given, is set when the request body has been consumed; until
+    then receive() belongs to whoever reads the body.
+    """
+    if body_read is not None:
+        await body_read.wait()
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(receive: Receive, awaitable: Awaitable, endpoint: str,
+                               body_read: Optional[asyncio.Event] = None) -> Any:
+    """Await `awaitable`, cancelling it and raising ClientDisconnected if the client leaves first."""
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(wait_for_disconnect(receive, body_read))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        watcher.cancel()
+        raise
+    watcher.cancel()
+    if task in done:
+        return task.result()
+    task.cancel()
+    # Let the cancellation reach the upstream calls before giving up on the request
+    await asyncio.wait({task})
+    if not task.cancelled():
+        task.exception()
+    CLIENT_DISCONNECTS.inc(endpoint)
+    raise ClientDisconnected()
@@ -0,0 +1,246 @@
+"""Filename-based tag suggestions.
+
+Pure functions with no API dependencies, so they can run in worker processes
+(see bulk_tagger.py) as well as behind the HTTP API. Vehicle names are read
+from the tag data once per process.
+
+The naming convention
+
+    FY<year>_<quarter>[_CCL|_MASTER][_<language>]_<vehicle>..._<media>[_<dimensions>][_<version>].<ext>
+
+is one compiled regular expression in which every part is optional, so any
+name parses: malformed names give partial results instead of exceptions.
+parse_filenames runs the grammar once over a whole batch of names and returns
+columnar output.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.data_files import load_car_models, load_tag_hierarchy
+from app.tag_rules import load_tag_rules
+from app.typo_index import TypoIndex
+
+LANGUAGE_CODES = {
+    'FIN': 'finnish',
+    'NOR': 'norwegian',
+    'SWE': 'swedish',
+    'DAN': 'danish',
+    'EST': 'estonian',
+    'LAT': 'latvian',
+    'LIT': 'lithuanian',
+    'RUS': 'russian',
+    'ENG': 'english'
+}
+
+# Media keyword in a filename -> system/media tag
+MEDIA_KEYWORDS = {
+    'STORY': 'story',
+    'BANNER': 'banner',
+    'PRINT': 'print',
+    'HTML5': 'html5-banner',
+    'EDM': 'edm',
+    'DM': 'dm',
+    'POS': 'pos',
+    'DOT': 'dot',
+    'DIGISCREEN': 'digiscreen',
+    'PRICELECTERN': 'pricelectern',
+    'LEAFLET': 'A4_leaflet',
+    'SOME': 'socialmedia',
+    'SOCIALMEDIA': 'socialmedia'
+}
+
+PROJECT_TYPES = ('CCL', 'MASTER')
+
+# Vehicles shorter than this (LEAF, JUKE, GT-R) have to be spelled exactly
+VEHICLE_TYPO_MIN_LENGTH = 5
+
+
+def _filename_forms(name: str) -> Set[str]:
+    # Filenames write X-TRAIL as X-TRAIL or XTRAIL
+    name = name.upper()
+    return {name, name.replace('-', '')}
+
+
+def vehicle_names() -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """(every vehicle name and keyword, model names only) as written in filenames.
+
+    Read from the same data as the description keyword matcher: the vehicles
+    of tag_rules.json, the filter/vehicle tags and car_models.json.
+    """
+    rules = load_tag_rules()
+    models = set(load_tag_hierarchy()['filter']['subcategories']['vehicle']) | set(load_car_models())
+    keywords = set()
+    for subcategory in rules.vehicles.values():
+        for model, model_keywords in subcategory.items():
+            models.add(model)
+            keywords.update(model_keywords)
+    for car in load_car_models().values():
+        keywords.update(car.get('keywords', ()))
+    model_forms = {form for model in models for form in _filename_forms(model)}
+    keyword_forms = {form for keyword in keywords for form in _filename_forms(keyword)}
+    return frozenset(model_forms | keyword_forms), frozenset(model_forms)
+
+
+# Vehicle tokens that are kept as written; misspelled models ('QASHQAL') are corrected
+KNOWN_VEHICLES, _MODEL_NAMES = vehicle_names()
+_VEHICLE_TYPOS = TypoIndex((name for name in _MODEL_NAMES if len(name) >= VEHICLE_TYPO_MIN_LENGTH),
+                           min_length=VEHICLE_TYPO_MIN_LENGTH)
+
+# Media types whose dimensions become banner/size tags
+BANNER_MEDIA = ('banner', 'html5-banner')
+
+FIELDS = ['fiscal_year', 'quarter', 'project_type', 'language', 'vehicles', 'media_type', 'dimensions', 'version']
+
+
+def _alternatives(words: Iterable[str]) -> str:
+    # Longest first so e.g. DM never shadows DIGISCREEN
+    return "|".join(sorted(map(re.escape, words), key=len, reverse=True))
+
+
+_TOKEN = r"[^_.\n]*"
+_END = r"(?=[_.\n]|$)"
+_MEDIA = rf"(?:{_alternatives(MEDIA_KEYWORDS)}){_END}"
+
+# One name per line; the extension (everything from the first dot) is ignored.
+# Tokens after the media keyword repeat, and a repeated group keeps its last
+# match, so a later dimension, version or media keyword wins.
+FILENAME_GRAMMAR = re.compile(
+    rf"""^
+    (?:(?P<fiscal_year>FY{_TOKEN})(?:_(?P<quarter>{_TOKEN}))? | {_TOKEN})
+    (?:_(?P<project_type>{_alternatives(PROJECT_TYPES)}){_END})?
+    (?:_(?P<language>{_alternatives(LANGUAGE_CODES)}){_END})?
+    (?P<vehicles>(?:_(?!{_MEDIA}){_TOKEN})*)
+    (?:_(?P<media_type>{_MEDIA})
+        (?:_(?:
+            (?P<later_media>{_MEDIA})
+            | (?P<dimensions>[^_.\n]*[xX][^_.\n]*)
+            | (?P<version>V[^_.\n]*|\d+){_END}
+            | {_TOKEN}
+        ))*
+    )?
+    (?:\.[^\n]*)?$""",
+    re.MULTILINE | re.VERBOSE
+)
+_GROUPS = tuple(FILENAME_GRAMMAR.groupindex[name] for name in (
+    'fiscal_year', 'quarter', 'project_type', 'language', 'vehicles', 'media_type', 'later_media',
+    'dimensions', 'version'))
+
+_DIMENSIONS = re.compile(r"(\d+)[xX](\d+)")
+
+
+def _normalize(text: str) -> str:
+    # Spaces separate parts like underscores; line breaks would split a name in a batch
+    return text.replace(' ', '_').replace('\r', '_')
+
+
+def _vehicle(token: str) -> str:
+    upper = token.upper()
+    if upper in KNOWN_VEHICLES:
+        return token
+    return _VEHICLE_TYPOS.correct(upper) or token
+
+
+def _vehicles(matched: Optional[str]) -> List[str]:
+    if not matched:
+        return []
+    return [_vehicle(vehicle) for vehicle in matched[1:].split('_') if vehicle]
+
+
+def _media_type(media: Optional[str], later_media: Optional[str]) -> Optional[str]:
+    return MEDIA_KEYWORDS[later_media or media] if media else None
+
+
+def parse_filename(filename: str) -> Dict:
+    """Parse a filename according to the naming convention and extract relevant information.
+
+    Parts that are missing or malformed are None (vehicles: empty list).
+    """
+    fiscal_year, quarter, project_type, language, vehicles, media, later_media, dimensions, version = \
+        FILENAME_GRAMMAR.match(_normalize(filename).replace('\n', '_')).group(*_GROUPS)
+    return {
+        'fiscal_year': fiscal_year,
+        'quarter': quarter,
+        'project_type': project_type,
+        'language': LANGUAGE_CODES.get(language),
+        'vehicles': _vehicles(vehicles),
+        'media_type': _media_type(media, later_media),
+        'dimensions': dimensions,
+        'version': version
+    }
+
+
+def parse_filenames(filenames: Iterable[str]) -> Dict[str, List]:
+    """Parse a batch of filenames into columns: {field: [value per filename]}.
+
+    The grammar runs once over all names joined by newlines, and each column is
+    then post-processed as a whole.
+    """
+    names = list(filenames)
+    if not names:
+        return {field: [] for field in FIELDS}
+    text = "\n".join(names)
+    if text.count("\n") != len(names) - 1:
+        text = "\n".join(name.replace("\n", "_") for name in names)
+    rows = [match.group(*_GROUPS) for match in FILENAME_GRAMMAR.finditer(_normalize(text))]
+    fiscal_year, quarter, project_type, language, vehicles, media, later_media, dimensions, version = zip(*rows)
+    return {
+        'fiscal_year': list(fiscal_year),
+        'quarter': list(quarter),
+        'project_type': list(project_type),
+        'language': list(map(LANGUAGE_CODES.get, language)),
+        'vehicles': list(map(_vehicles, vehicles)),
+        'media_type': list(map(_media_type, media, later_media)),
+        'dimensions': list(dimensions),
+        'version': list(version)
+    }
+
+
+def banner_size(dimensions: Optional[str]) -> Optional[str]:
+    """'300x250' -> '300x250'; None for anything that isn't WIDTHxHEIGHT."""
+    match = _DIMENSIONS.fullmatch(dimensions or "")
+    return f"{match[1]}x{match[2]}" if match else None
+
+
+def suggestions_from_parsed(parsed: Dict) -> Dict:
+    """Tag suggestions for one parse_filename result."""
+    suggestions = []
+
+    # Add language tag
+    if parsed['language']:
+        suggestions.append({
+            "category": "language",
+            "suggested_tags": [f"language/{parsed['language']}"],
+            "confidence": 1.0
+        })
+
+    # Add vehicle tags
+    if parsed['vehicles']:
+        suggestions.append({
+            "category": "filter",
+            "suggested_tags": [f"filter/vehicle/{vehicle}" for vehicle in parsed['vehicles']],
+            "confidence": 1.0
+        })
+
+    # Add media type tag
+    if parsed['media_type']:
+        suggestions.append({
+            "category": "system/media",
+            "suggested_tags": [f"system/media/{parsed['media_type']}"],
+            "confidence": 1.0
+        })
+
+    # Add size tag for banners
+    size = banner_size(parsed['dimensions']) if parsed['media_type'] in BANNER_MEDIA else None
+    if size:
+        suggestions.append({
+            "category": "banner/size",
+            "suggested_tags": [f"banner/size/{size}"],
+            "confidence": 1.0
+        })
+
+    return {"suggestions": suggestions}
+
+
+def suggest_tags_from_filename(filename: str) -> Dict:
+    """Suggest tags based on a filename."""
+    return suggestions_from_parsed(parse_filename(filename))
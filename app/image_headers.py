@@ -0,0 +1,202 @@
+"""Format and dimensions of an uploaded file from its first bytes.
+
+HeaderSniffer is fed a file chunk by chunk and stops as soon as it knows the
+answer, so the rest of the file only has to be read past, never stored:
+
+- PNG, GIF: fixed offsets in the first 24 bytes
+- JPEG: the segments before the frame header (SOF) are skipped by their
+  length, so large EXIF or ICC blocks are never buffered
+- SVG: width/height (or viewBox) of the root <svg> element
+- PDF: the first /MediaBox, in points
+
+At most MAX_HEADER_BYTES are buffered per file; SVGs and PDFs whose sizes are
+not found within them report their format without dimensions. Nothing is
+decoded, so a corrupt file, or a size that is not a number or is out of
+range, simply yields no dimensions.
+"""
+import re
+from typing import NamedTuple, Optional
+
+MAX_HEADER_BYTES = 256 * 1024
+# Larger sizes (PNG's own limit) are garbage and are reported as unknown
+MAX_DIMENSION = 2 ** 31 - 1
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+# Frame header markers: every SOFn except DHT (C4), JPG (C8) and DAC (CC)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+_JPEG_STANDALONE = frozenset(range(0xD0, 0xD9)) | {0x01}
+
+_SVG_ROOT = re.compile(rb"<svg\b([^>]*)>")
+_SVG_ATTRIBUTE = re.compile(rb"""(?:^|\s)(width|height|viewBox)\s*=\s*["']([^"']*)["']""")
+_SVG_LENGTH = re.compile(rb"\s*([\d.]+)\s*(px)?\s*$")
+_PDF_MEDIA_BOX = re.compile(rb"/MediaBox\s*\[\s*(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s*\]")
+
+
+class ImageInfo(NamedTuple):
+    format: str  # png, jpeg, gif, svg or pdf
+    width: Optional[int]
+    height: Optional[int]
+    unit: str = "px"  # PDF page sizes are in points
+
+
+def _dimension(value) -> Optional[int]:
+    """A length rounded to whole units, or None if it is not a number or out of range."""
+    try:
+        size = round(float(value))
+    except (ValueError, OverflowError):
+        # '.', 'nan', or too large for a float ('inf')
+        return None
+    return size if 0 <= size <= MAX_DIMENSION else None
+
+
+def _svg_size(attributes: bytes):
+    values = {name: value for name, value in _SVG_ATTRIBUTE.findall(attributes)}
+    sizes = []
+    for name in (b"width", b"height"):
+        match = _SVG_LENGTH.match(values.get(name, b""))
+        sizes.append(_dimension(match.group(1)) if match else None)
+    if None in sizes and b"viewBox" in values:
+        # Relative or physical units: fall back to the user coordinate system
+        box = values[b"viewBox"].replace(b",", b" ").split()
+        box_sizes = [_dimension(value) for value in box[2:]] if len(box) == 4 else [None]
+        if None not in box_sizes:
+            sizes = box_sizes
+    return sizes
+
+
+class HeaderSniffer:
+    """Incremental format and dimension detection; feed() until it returns True, then read info."""
+
+    def __init__(self, limit: int = MAX_HEADER_BYTES):
+        self.limit = limit
+        self.format: Optional[str] = None
+        self.info: Optional[ImageInfo] = None
+        self.done = False
+        self._buffer = bytearray()
+        self._skip = 0
+        self._searched = 0
+
+    def feed(self, data: bytes) -> bool:
+        """Add the next chunk; True once the answer is known (the rest of the file is not needed)."""
+        if self.done:
+            return True
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            data = data[skipped:]
+            if not data:
+                return False
+        self._buffer += data
+        self._parse()
+        if not self.done and len(self._buffer) > self.limit:
+            self._finish()
+        return self.done
+
+    def close(self) -> Optional[ImageInfo]:
+        """End of file: whatever was found."""
+        if not self.done:
+            self._parse(final=True)
+            self._finish()
+        return self.info
+
+    def _finish(self, width: Optional[int] = None, height: Optional[int] = None) -> None:
+        if self.format not in (None, "markup"):
+            self.info = ImageInfo(self.format, width, height, "pt" if self.format == "pdf" else "px")
+        self.done = True
+        self._buffer = bytearray()
+
+    def _parse(self, final: bool = False) -> None:
+        buffer = self._buffer
+        if self.format is None:
+            if len(buffer) < 8 and not final:
+                return
+            if buffer.startswith(_PNG_SIGNATURE):
+                self.format = "png"
+            elif buffer[:6] in _GIF_SIGNATURES:
+                self.format = "gif"
+            elif buffer.startswith(b"\xff\xd8"):
+                self.format = "jpeg"
+                del buffer[:2]
+            elif buffer.startswith(b"%PDF-"):
+                self.format = "pdf"
+            elif buffer.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+                # XML of some kind; an SVG once its root element shows up
+                self.format = "markup"
+            else:
+                self._finish()
+                return
+        getattr(self, f"_parse_{self.format}")()
+
+    def _parse_png(self) -> None:
+        if len(self._buffer) >= 24:
+            if self._buffer[12:16] == b"IHDR":
+                self._finish(int.from_bytes(self._buffer[16:20], "big"), int.from_bytes(self._buffer[20:24], "big"))
+            else:
+                self._finish()
+
+    def _parse_gif(self) -> None:
+        if len(self._buffer) >= 10:
+            self._finish(int.from_bytes(self._buffer[6:8], "little"), int.from_bytes(self._buffer[8:10], "little"))
+
+    def _parse_jpeg(self) -> None:
+        buffer = self._buffer
+        position = 0
+        while position + 2 <= len(buffer):
+            if buffer[position] != 0xFF:
+                self._finish()
+                return
+            marker = buffer[position + 1]
+            if marker == 0xFF:
+                position += 1  # Fill byte
+                continue
+            if marker in _JPEG_STANDALONE:
+                position += 2
+                continue
+            if marker in (0xD9, 0xDA):
+                # End of image or start of scan data without a frame header
+                self._finish()
+                return
+            if marker in _JPEG_SOF:
+                if position + 9 > len(buffer):
+                    break
+                height = int.from_bytes(buffer[position + 5:position + 7], "big")
+                width = int.from_bytes(buffer[position + 7:position + 9], "big")
+                self._finish(width, height)
+                return
+            if position + 4 > len(buffer):
+                break
+            end = position + 2 + int.from_bytes(buffer[position + 2:position + 4], "big")
+            if end > len(buffer):
+                # Skip the rest of this segment as it arrives instead of buffering it
+                self._skip = end - len(buffer)
+                position = len(buffer)
+                break
+            position = end
+        del buffer[:position]
+
+    def _parse_markup(self) -> None:
+        match = _SVG_ROOT.search(self._buffer)
+        if match:
+            self.format = "svg"
+            self._finish(*_svg_size(match.group(1)))
+
+    def _parse_pdf(self) -> None:
+        # Only search what arrived since the last call, plus room for a box split across chunks
+        match = _PDF_MEDIA_BOX.search(self._buffer, max(0, self._searched - 128))
+        self._searched = len(self._buffer)
+        if match:
+            try:
+                x0, y0, x1, y1 = (float(value) for value in match.groups())
+            except ValueError:
+                self._finish()
+                return
+            self._finish(_dimension(abs(x1 - x0)), _dimension(abs(y1 - y0)))
+
+
+def sniff(data: bytes) -> Optional[ImageInfo]:
+    """Format and dimensions of a complete header (or whole file) in memory."""
+    sniffer = HeaderSniffer()
+    sniffer.feed(data)
+    return sniffer.close()
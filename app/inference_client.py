@@ -0,0 +1,151 @@
+"""Async client for the Hugging Face zero-shot classification API.
+
+One pooled httpx.AsyncClient with keep-alive connections is shared by every
+request of a worker process, and the candidate label batches of a description
+are dispatched concurrently instead of one after another.
+
+A batch call still unanswered after the recent p95 upstream latency gets a
+hedged duplicate; whichever answers first is used and the other is cancelled.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import HEDGED_REQUESTS, STAGE_SECONDS, UPSTREAM_CANCELLATIONS
+from app.resilience import LatencyTracker
+
+
+class InferenceError(Exception):
+    """The inference API returned an error response."""
+
+
+class InferenceClient:
+    def __init__(self, api_url: str, api_key: str, batch_size: int = 10, timeout: float = 5.0,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 hedge_percentile: float = 0.95, max_hedge_ratio: float = 0.1):
+        self.api_url = api_url
+        self.batch_size = batch_size  # Model limitation
+        self.timeout = timeout
+        # hedge_percentile 0 disables hedging; max_hedge_ratio caps the extra upstream load
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.latency = LatencyTracker()
+        self.batches = 0
+        self.hedged = 0
+        self.hedges_won = 0
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pid: Optional[int] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Connections must not be shared across forked worker processes
+        if self._client is None or self._pid != os.getpid():
+            self._client = httpx.AsyncClient(headers=self._headers, limits=self._limits, timeout=self.timeout)
+            self._pid = os.getpid()
+        return self._client
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging a batch call, or None to not hedge it."""
+        if not self.hedge_percentile or self.hedged >= self.max_hedge_ratio * self.batches:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _post(self, payload: Dict) -> Tuple[List[str], List[float]]:
+        start = time.perf_counter()
+        response = await self._get_client().post(self.api_url, json=payload)
+        if response.status_code != 200:
+            raise InferenceError(f"API call failed with status code {response.status_code}: {response.text}")
+        self.latency.record(time.perf_counter() - start)
+        result = response.json()
+        return result.get('labels', []), result.get('scores', [])
+
+    async def _hedged_post(self, payload: Dict) -> Tuple[List[str], List[float]]:
+        """_post, duplicated once the call has been outstanding for hedge_delay()."""
+        primary = asyncio.ensure_future(self._post(payload))
+        hedge = None
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.hedged += 1
+                    hedge = asyncio.ensure_future(self._post(payload))
+                    pending.add(hedge)
+            winner = None
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # A failed call only fails the batch once its duplicate has failed too
+                winner = next((task for task in done if task.exception() is None), None)
+        finally:
+            for task in pending:
+                task.cancel()
+        if winner is None:
+            return done.pop().result()
+        if hedge is not None:
+            self.hedges_won += winner is hedge
+            HEDGED_REQUESTS.inc("hedge" if winner is hedge else "primary")
+        return winner.result()
+
+    async def classify_batch(self, description: str, labels: List[str]) -> Tuple[List[str], List[float]]:
+        """Score one batch of candidate labels against the description."""
+        payload = {
+            "inputs": description,
+            "parameters": {
+                "candidate_labels": labels,
+                "multi_label": True
+            }
+        }
+        self.batches += 1
+        start = time.perf_counter()
+        try:
+            return await self._hedged_post(payload)
+        except asyncio.CancelledError:
+            UPSTREAM_CANCELLATIONS.inc()
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, "upstream_batch")
+
+    async def classify(self, description: str, labels: List[str]) -> Tuple[List[str], List[float]]:
+        """Score all candidate labels, dispatching the label batches concurrently."""
+        batches = [labels[i:i + self.batch_size] for i in range(0, len(labels), self.batch_size)]
+        if not batches:
+            return [], []
+        tasks = [asyncio.ensure_future(self.classify_batch(description, tag_batch)) for tag_batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed batch fails the whole call; don't leave the others running
+            for task in tasks:
+                task.cancel()
+            raise
+
+        # Combine results from all batches, in batch order
+        combined_labels: List[str] = []
+        combined_scores: List[float] = []
+        for batch_labels, batch_scores in results:
+            combined_labels.extend(batch_labels)
+            combined_scores.extend(batch_scores)
+        return combined_labels, combined_scores
+
+    def stats(self) -> Dict:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "backend": "remote",
+            "batches": self.batches,
+            "hedged": self.hedged,
+            "hedges_won": self.hedges_won,
+            "latency_p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "latency_p95_ms": None if p95 is None else round(p95 * 1000, 1)
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._pid == os.getpid():
+            await self._client.aclose()
+        self._client = None
@@ -0,0 +1,172 @@
+"""Single-pass keyword matching for tag suggestions.
+
+All keyword tables of a suggester are compiled once into a token index, so a
+description is tokenized a single time and every keyword group is resolved with
+set lookups instead of one substring scan per keyword.
+
+Descriptions and keywords are split into tokens on whitespace and punctuation
+('X-Trail, A4' -> x, trail, a4). A keyword matches when its tokens appear as
+consecutive whole tokens, so short codes such as 'fi', 'no', 'et' or 'xt' no
+longer fire inside words like 'office', 'note' or 'next'. Tokens that glue
+letters to digits are also looked up by their parts, so 'qashqai2024' still
+matches 'qashqai'.
+
+Groups added with fuzzy=True also match misspelled keywords: a word that hits
+no keyword is looked up in a typo index (app/typo_index.py) of those groups'
+keywords, with their tokens joined ('x-trail' -> 'xtrail'), so 'quashqai' and
+'xtrial' still match. Words shorter than FUZZY_MIN_LENGTH or too long to be
+a typo of any keyword, and the ignored words passed to the matcher (real
+words one typo from a keyword, such as 'finish'), are never corrected.
+"""
+import re
+import string
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from app.typo_index import TypoIndex
+
+# Punctuation is turned into whitespace before splitting
+_SEPARATORS = {ord(ch): " " for ch in string.punctuation + "–—‘’“”«»…"}
+_DIGITS = "0123456789"
+_LETTER_OR_DIGIT_RUN = re.compile(r"[^\W\d_]+|\d+")
+
+# Shorter words are too close to too many others to be corrected
+FUZZY_MIN_LENGTH = 6
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase tokens on whitespace and punctuation."""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+class KeywordMatches:
+    """Labels hit by a single scan, grouped by keyword group."""
+
+    __slots__ = ("_hits", "_order")
+
+    def __init__(self, hits: Dict[str, Set[str]], order: Mapping[str, Tuple[str, ...]]):
+        self._hits = hits
+        self._order = order
+
+    def __contains__(self, group: str) -> bool:
+        return group in self._hits
+
+    def labels(self, group: str) -> List[str]:
+        """All labels of a group that were hit, in declaration order."""
+        hits = self._hits.get(group)
+        if not hits:
+            return []
+        return [label for label in self._order[group] if label in hits]
+
+    def first(self, group: str) -> Optional[str]:
+        """The first label of a group (in declaration order) that was hit."""
+        hits = self._hits.get(group)
+        if not hits:
+            return None
+        for label in self._order[group]:
+            if label in hits:
+                return label
+        return None
+
+    def has(self, group: str, label: str) -> bool:
+        return label in self._hits.get(group, ())
+
+
+class KeywordMatcher:
+    """Token index over every keyword of every group."""
+
+    def __init__(self, fuzzy_ignore: Iterable[str] = ()):
+        self._order: Dict[str, List[str]] = {}
+        # keyword tokens -> [(group, label), ...]
+        self._targets: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        self._fuzzy_groups: Set[str] = set()
+        self._fuzzy_ignore = frozenset(word.lower() for word in fuzzy_ignore)
+        self._fuzzy_targets: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        self._typos: Optional[TypoIndex] = None
+        self._words: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        self._phrases: Dict[str, Tuple[Tuple[str, Tuple[Tuple[str, str], ...]], ...]] = {}
+        self._heads: FrozenSet[str] = frozenset()
+        self._frozen_order: Dict[str, Tuple[str, ...]] = {}
+        self._compiled = False
+
+    def add(self, group: str, label: str, keywords: Iterable[str], fuzzy: bool = False) -> "KeywordMatcher":
+        """Register keywords that map to `label` within `group`; fuzzy=True also matches their typos."""
+        if fuzzy:
+            self._fuzzy_groups.add(group)
+        labels = self._order.setdefault(group, [])
+        if label not in labels:
+            labels.append(label)
+        for keyword in keywords:
+            tokens = tuple(tokenize(keyword))
+            if tokens and (group, label) not in self._targets.get(tokens, ()):
+                self._targets.setdefault(tokens, []).append((group, label))
+        self._compiled = False
+        return self
+
+    def add_group(self, group: str, table: Mapping[str, Iterable[str]], fuzzy: bool = False) -> "KeywordMatcher":
+        """Register a whole {label: keywords} table as one group."""
+        for label, keywords in table.items():
+            self.add(group, label, keywords, fuzzy)
+        return self
+
+    def compile(self) -> "KeywordMatcher":
+        """Freeze the index: single-token keywords by token, phrases by first token."""
+        words: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        phrases: Dict[str, List[Tuple[str, Tuple[Tuple[str, str], ...]]]] = {}
+        fuzzy: Dict[str, List[Tuple[str, str]]] = {}
+        for tokens, targets in self._targets.items():
+            if len(tokens) == 1:
+                words[tokens[0]] = tuple(targets)
+            else:
+                # Phrases are verified against the space-joined token stream
+                phrases.setdefault(tokens[0], []).append((f" {' '.join(tokens)} ", tuple(targets)))
+            word = "".join(tokens)
+            if len(word) >= FUZZY_MIN_LENGTH and word.isalpha():
+                for target in targets:
+                    if target[0] in self._fuzzy_groups and target not in fuzzy.get(word, ()):
+                        fuzzy.setdefault(word, []).append(target)
+        self._words = words
+        self._phrases = {head: tuple(entries) for head, entries in phrases.items()}
+        self._fuzzy_targets = {word: tuple(targets) for word, targets in fuzzy.items()}
+        self._typos = TypoIndex(fuzzy, min_length=FUZZY_MIN_LENGTH) if fuzzy else None
+        self._heads = frozenset(words) | frozenset(phrases)
+        self._frozen_order = {group: tuple(labels) for group, labels in self._order.items()}
+        self._compiled = True
+        return self
+
+    def scan(self, text: str) -> KeywordMatches:
+        """Find every keyword hit in `text` with a single tokenization pass."""
+        if not self._compiled:
+            self.compile()
+        tokens = tokenize(text)
+        heads = self._heads
+        candidates = heads.intersection(tokens)
+        if any(digit in text for digit in _DIGITS):
+            # Split glued tokens such as 'qashqai2024' into letter and digit runs
+            for token in set(tokens).difference(heads):
+                if not token.isalpha() and not token.isdigit():
+                    candidates = candidates | heads.intersection(_LETTER_OR_DIGIT_RUN.findall(token))
+
+        hits: Dict[str, Set[str]] = {}
+        joined = None
+        for token in candidates:
+            for group, label in self._words.get(token, ()):
+                hits.setdefault(group, set()).add(label)
+            entries = self._phrases.get(token)
+            if entries:
+                if joined is None:
+                    joined = f" {' '.join(tokens)} "
+                for phrase, targets in entries:
+                    if phrase in joined:
+                        for group, label in targets:
+                            hits.setdefault(group, set()).add(label)
+
+        if self._typos is not None:
+            max_length = self._typos.max_query_length
+            for token in set(tokens).difference(heads):
+                if not FUZZY_MIN_LENGTH <= len(token) <= max_length or not token.isalpha() \
+                        or token in self._fuzzy_ignore:
+                    continue
+                word = self._typos.correct(token)
+                for group, label in self._fuzzy_targets.get(word, ()):
+                    hits.setdefault(group, set()).add(label)
+        return KeywordMatches(hits, self._frozen_order)
@@ -0,0 +1,143 @@
+"""In-process zero-shot scorer, an alternative to the remote BART model.
+
+Every tag path of the hierarchy is turned into one or more keyword prototypes
+(the tag's last segment plus its keywords from tag_rules.json). Each prototype
+is precomputed as a hashed character-trigram vector. A description is scored by
+how much of each prototype's trigrams it contains, the best prototype per label
+wins, and the result is squashed into a 0..1 confidence. Scoring a batch of
+descriptions is a single matrix product.
+
+Selected with INFERENCE_BACKEND=local; requires numpy.
+"""
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.keyword_matcher import tokenize
+from app.tag_paths import iter_car_model_paths, iter_tag_paths
+from app.tag_rules import TagRules
+
+N_FEATURES = 4096
+NGRAM = 3
+
+
+def _ngrams(text: str) -> Iterable[str]:
+    for token in tokenize(text):
+        padded = f" {token} "
+        if len(padded) <= NGRAM:
+            yield padded
+        else:
+            for i in range(len(padded) - NGRAM + 1):
+                yield padded[i:i + NGRAM]
+
+
+def hash_features(text: str) -> np.ndarray:
+    """Unique hashed trigram indices of a text."""
+    return np.unique(np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) & (N_FEATURES - 1) for gram in _ngrams(text)),
+        dtype=np.int64
+    ))
+
+
+def label_keywords(label: str, rules: Optional[TagRules]) -> List[str]:
+    """Keyword prototypes for a tag path: its last segment plus rule keywords."""
+    segments = label.split('/')
+    keywords = [segments[-1].replace('_', ' ')]
+    if rules is not None:
+        if segments[0] == 'language':
+            keywords.extend(rules.languages.get(segments[-1], ()))
+        elif segments[:2] == ['system', 'media'] and segments[-1] in rules.media:
+            keywords.extend(rules.media[segments[-1]].keywords)
+        elif segments[:2] == ['system', 'size']:
+            keywords.extend(rules.sizes.get(segments[-1], ()))
+        elif segments[0] == 'filter' and len(segments) == 3:
+            keywords.extend(rules.vehicles.get(segments[1], {}).get(segments[2], ()))
+    # Drop duplicates and codes too short to carry a trigram signal
+    return list(dict.fromkeys(k for k in keywords if len(k) > 2))
+
+
+class LocalScorer:
+    """Vectorized scorer with the same classify() interface as InferenceClient."""
+
+    def __init__(self, labels: Dict[str, List[str]], midpoint: float = 0.6, steepness: float = 12.0):
+        self.midpoint = midpoint
+        self.steepness = steepness
+        self._rules: Optional[TagRules] = None
+        self._index: Dict[str, int] = {}
+        self._prototypes: List[np.ndarray] = []
+        self._offsets: List[int] = []
+        for label, keywords in labels.items():
+            self._add_label(label, keywords)
+        self._build()
+
+    @classmethod
+    def from_hierarchy(cls, tag_hierarchy: Dict, rules: Optional[TagRules] = None,
+                       car_models: Optional[Dict] = None, **kwargs) -> "LocalScorer":
+        """Precompute prototypes for every tag path of the hierarchy (and car models)."""
+        paths = list(iter_tag_paths(tag_hierarchy))
+        if car_models:
+            paths.extend(iter_car_model_paths(car_models))
+        scorer = cls({path: label_keywords(path, rules) for path in dict.fromkeys(paths)}, **kwargs)
+        scorer._rules = rules
+        return scorer
+
+    def _add_label(self, label: str, keywords: Sequence[str]) -> None:
+        self._index[label] = len(self._offsets)
+        self._offsets.append(len(self._prototypes))
+        for keyword in keywords or [label]:
+            self._prototypes.append(hash_features(keyword))
+
+    def _build(self) -> None:
+        # Rows are L1-normalized so a row . description = fraction of its trigrams present
+        matrix = np.zeros((len(self._prototypes), N_FEATURES), dtype=np.float32)
+        for row, features in enumerate(self._prototypes):
+            if len(features):
+                matrix[row, features] = 1.0 / len(features)
+        self._matrix = matrix
+        self._starts = np.asarray(self._offsets, dtype=np.int64)
+
+    def _label_rows(self, labels: Sequence[str]) -> np.ndarray:
+        missing = [label for label in labels if label not in self._index]
+        if missing:
+            # Labels outside the hierarchy get prototypes on first use
+            for label in missing:
+                self._add_label(label, label_keywords(label, self._rules))
+            self._build()
+        return np.fromiter((self._index[label] for label in labels), dtype=np.int64, count=len(labels))
+
+    def _calibrate(self, containment: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.steepness * (containment - self.midpoint)))
+
+    def score_batch(self, descriptions: Sequence[str], labels: Sequence[str]) -> np.ndarray:
+        """Confidence matrix of shape (len(descriptions), len(labels))."""
+        rows = self._label_rows(labels)
+        vectors = np.zeros((len(descriptions), N_FEATURES), dtype=np.float32)
+        for i, description in enumerate(descriptions):
+            vectors[i, hash_features(description)] = 1.0
+        containment = vectors @ self._matrix.T
+        # Best prototype per label: max over each label's contiguous block of rows
+        per_label = np.maximum.reduceat(containment, self._starts, axis=1)
+        return self._calibrate(per_label[:, rows])
+
+    def score(self, description: str, labels: Sequence[str]) -> np.ndarray:
+        """Confidences of one description against the given labels."""
+        rows = self._label_rows(labels)
+        features = hash_features(description)
+        containment = self._matrix[:, features].sum(axis=1)
+        per_label = np.maximum.reduceat(containment, self._starts)
+        return self._calibrate(per_label[rows])
+
+    async def classify(self, description: str, labels: List[str]) -> Tuple[List[str], List[float]]:
+        """Same result shape as the remote API: labels sorted by descending score."""
+        if not labels:
+            return [], []
+        scores = self.score(description, labels)
+        order = np.argsort(-scores, kind="stable")
+        return [labels[i] for i in order], [float(scores[i]) for i in order]
+
+    def stats(self) -> Dict:
+        return {"backend": "local"}
+
+    async def aclose(self) -> None:
+        pass
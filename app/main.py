@@ -1,13 +1,53 @@
-from fastapi import FastAPI, HTTPException
+# Imported first: startup timing starts here
+from app.startup import is_ready, mark_loaded, mark_ready, mark_stopping, on_warm_up, run_warm_up, startup_stats
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict
-import json
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
 import os
-from app.tag_suggester import suggest_tags
-from app.asset_tags_suggester import suggest_asset_tags
+import time
+import orjson
+from app.tag_suggester import (suggest_tags, suggest_tags_from_filename, stream_suggestions, inference_client,
+                               api_cache, circuit_breaker, inference_flights, ranker, TEMPLATE_MATCHER,
+                               assemble_suggestions)
+from app.data_files import load_car_models, load_tag_hierarchy
+from app.asset_tags_suggester import suggest_asset_tags, suggest_upload_tags
+from app.image_headers import sniff
+from app.uploads import UploadError, UploadedFile, read_file, read_multipart
+from app.precompressed import PrecompressedJSON
+from app.tag_index import DEFAULT_LIMIT, MAX_LIMIT, TagIndex
+from app.sse import EventStreamResponse, sse_event
+from app.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.batch import DEFAULT_CONCURRENCY, MAX_CONCURRENCY, NDJSONStreamingResponse, iter_ndjson, run_batch
+from app.metrics import (CLIENT_DISCONNECTS, REGISTRY, SUGGESTION_SECONDS, SUGGESTIONS, MetricsMiddleware,
+                         flush_periodically, worker_snapshot_path)
 
-app = FastAPI(title="Template Tagging Helper")
+# Shared metrics directory for all uvicorn workers (unset: per-worker metrics)
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Share this worker's metrics with the others through METRICS_DIR
+    flusher = None
+    if METRICS_DIR:
+        flusher = asyncio.create_task(flush_periodically(REGISTRY, METRICS_DIR, METRICS_FLUSH_INTERVAL))
+    # No-op in workers forked from a preloaded, warmed-up parent (app/serve.py)
+    run_warm_up()
+    mark_ready()
+    yield
+    mark_stopping()
+    if flusher:
+        flusher.cancel()
+        REGISTRY.dump(worker_snapshot_path(METRICS_DIR))
+    # Close pooled upstream connections on shutdown
+    await inference_client.aclose()
+
+app = FastAPI(title="Template Tagging Helper", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -18,18 +58,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load tag hierarchy from JSON file
-def load_tag_hierarchy():
-    with open("/var/www/taggenie/app/tag_hierarchy.json", "r") as f:
-        return json.load(f)
+# Request counts and latency per route
+app.add_middleware(MetricsMiddleware)
 
 # Tag hierarchy structure
 TAG_HIERARCHY = load_tag_hierarchy()
 
+# /tags body, compressed variants and ETag, built once
+TAGS_RESPONSE = PrecompressedJSON(TAG_HIERARCHY, max_age=int(os.getenv("TAGS_CACHE_MAX_AGE", "86400")))
+
+# Autocomplete index over every full tag path
+TAG_INDEX = TagIndex.from_hierarchy(TAG_HIERARCHY, load_car_models())
+
+class ConditionalTag(BaseModel):
+    description: Dict[str, str]
+    trigger_tags: List[str]
+
 class TagSuggestion(BaseModel):
     category: str
     suggested_tags: List[str]
     confidence: float
+    conditional_tags: Optional[Dict[str, ConditionalTag]] = None
+
+class SuggestionError(BaseModel):
+    message: str
+    type: str
+
+class TagSuggestionResponse(BaseModel):
+    suggestions: List[TagSuggestion]
+    is_fallback: Optional[bool] = None
+    error: Optional[SuggestionError] = None
 
 class TagRequest(BaseModel):
     description: str = ""  # Make description optional
@@ -40,27 +98,248 @@ class TagRequest(BaseModel):
 async def root():
     return {"message": "Template Tagging Helper API"}
 
+@app.get("/healthz")
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    """200 once this worker has loaded, warmed up and started; 503 before and while shutting down."""
+    return ORJSONResponse({"ready": is_ready(), "startup": startup_stats()}, status_code=200 if is_ready() else 503)
+
 @app.get("/tags")
-async def get_tag_hierarchy():
-    return TAG_HIERARCHY
+async def get_tag_hierarchy(request: Request):
+    return TAGS_RESPONSE.respond(request)
 
-@app.post("/api/suggest_tags")
-async def get_tag_suggestions(request: TagRequest):
+@app.get("/tags/search")
+async def search_tags(
+    prefix: str = Query(..., min_length=1, max_length=200),
+    mode: str = Query("auto", pattern="^(auto|prefix|segment|fuzzy)$"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+):
+    """Autocomplete full tag paths by path prefix, segment prefix or fuzzy segment match."""
+    return {"query": prefix, "mode": mode, "results": TAG_INDEX.search(prefix, mode, limit)}
+
+@app.get("/api/cache_stats")
+async def get_cache_stats():
+    return api_cache.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(METRICS_DIR), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/inference_stats")
+async def get_inference_stats():
+    return {
+        "circuit_breaker": circuit_breaker.stats(),
+        "coalescing": inference_flights.stats(),
+        "upstream": inference_client.stats(),
+        "local_ranker": ranker.stats() if ranker is not None else None
+    }
+
+def request_type_of(request: TagRequest) -> str:
+    """Metrics label for the kind of request."""
+    request_type = "filename" if request.filename else request.type
+    return request_type if request_type in ("filename", "template", "asset") else "invalid"
+
+def result_outcome(result: Dict) -> str:
+    return "is_fallback" if result.get("is_fallback") else "ok"
+
+def record_suggestion(endpoint: str, request: TagRequest, start: float, outcome: str) -> None:
+    request_type = request_type_of(request)
+    SUGGESTION_SECONDS.observe(time.perf_counter() - start, endpoint, request_type)
+    SUGGESTIONS.inc(endpoint, request_type, outcome)
+
+async def suggest_for_request(request: TagRequest, endpoint: str = "/api/suggest_tags") -> Dict:
+    """Dispatch a single request to the matching suggester, recording its outcome and latency."""
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        # If filename is provided, use filename-based suggestion
-        if request.filename:
-            return suggest_tags_from_filename(request.filename)
-        
-        # Otherwise use description-based suggestion
-        if request.type == "template":
-            return suggest_tags(request.description)
-        elif request.type == "asset":
-            return suggest_asset_tags(request.description)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid type. Must be either 'template' or 'asset'")
+        result = await dispatch_request(request)
+        outcome = result_outcome(result)
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        record_suggestion(endpoint, request, start, outcome)
+
+async def dispatch_request(request: TagRequest) -> Dict:
+    """Dispatch a single request to the matching suggester."""
+    # If filename is provided, use filename-based suggestion
+    if request.filename:
+        return suggest_tags_from_filename(request.filename)
+    
+    # Otherwise use description-based suggestion
+    if request.type == "template":
+        return await suggest_tags(request.description)
+    elif request.type == "asset":
+        return suggest_asset_tags(request.description)
+    else:
+        raise HTTPException(status_code=400, detail="Invalid type. Must be either 'template' or 'asset'")
+
+# The response is documented, not validated: suggesters build plain dicts of this shape
+# (tests/test_responses.py checks them) and orjson serializes them directly
+@app.post("/api/suggest_tags", responses={200: {"model": TagSuggestionResponse}})
+async def get_tag_suggestions(request: TagRequest, http_request: Request):
+    try:
+        # Abandoned requests (the user kept typing) cancel their upstream calls
+        result = await cancel_on_disconnect(http_request.receive, suggest_for_request(request), "/api/suggest_tags")
+        return ORJSONResponse(result)
+    except ClientDisconnected:
+        # Nobody reads this; 499 (nginx's "client closed request") shows up in the request metrics
+        return Response(status_code=499)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def suggestion_events(request: TagRequest) -> AsyncIterator[Tuple[str, Dict]]:
+    """(event, payload) pairs for a request; only templates have a model stage to wait for."""
+    if not request.filename and request.type == "template":
+        async for event in stream_suggestions(request.description):
+            yield event
+    else:
+        yield "final", await dispatch_request(request)
+
+def event_stream(request: TagRequest) -> EventStreamResponse:
+    """Progressive suggestions as Server-Sent Events: suggestions, update, final (or error)."""
+    if not request.filename and request.type not in ("template", "asset"):
+        raise HTTPException(status_code=400, detail="Invalid type. Must be either 'template' or 'asset'")
+    endpoint = "/api/suggest_tags/stream"
+    
+    async def events():
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async for event, payload in suggestion_events(request):
+                if event == "final":
+                    outcome = result_outcome(payload)
+                yield sse_event(event, payload)
+        except asyncio.CancelledError:
+            # StreamingResponse cancels the stream when the client disconnects
+            outcome = "cancelled"
+            CLIENT_DISCONNECTS.inc(endpoint)
+            raise
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            record_suggestion(endpoint, request, start, outcome)
+    
+    return EventStreamResponse(events())
+
+@app.get("/api/suggest_tags/stream")
+async def stream_tag_suggestions_get(request: TagRequest = Depends()):
+    """EventSource-friendly variant taking description, type and filename as query parameters."""
+    return event_stream(request)
+
+@app.post("/api/suggest_tags/stream")
+async def stream_tag_suggestions(request: TagRequest):
+    return event_stream(request)
+
+async def suggest_batch_item(item) -> Dict:
+    """Suggest tags for one batch item, turning failures into an error entry."""
+    try:
+        if isinstance(item, Exception):
+            raise HTTPException(status_code=400, detail=f"Invalid JSON line: {item}")
+        return {"result": await suggest_for_request(TagRequest.model_validate(item), "/api/suggest_tags/batch")}
+    except ValidationError as e:
+        return {"error": {"status": 422, "detail": e.errors(include_url=False)}}
+    except HTTPException as e:
+        return {"error": {"status": e.status_code, "detail": e.detail}}
+    except Exception as e:
+        return {"error": {"status": 500, "detail": str(e)}}
+
+@app.post("/api/suggest_tags/batch")
+async def get_batch_tag_suggestions(
+    request: Request,
+    concurrency: int = Query(DEFAULT_CONCURRENCY, ge=1, le=MAX_CONCURRENCY),
+    order: str = Query("input", pattern="^(input|completion)$")
+):
+    """Suggest tags for a JSON array or an NDJSON upload of TagRequest objects.
+
+    Results are streamed back as NDJSON lines of {"index", "result"} or
+    {"index", "error"}, in input order or, with order=completion, as they finish.
+    """
+    content_type = request.headers.get("content-type", "")
+    body_read = asyncio.Event()
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = iter_ndjson(request.stream(), body_read)
+    else:
+        try:
+            items = orjson.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        body_read.set()
+    
+    async def lines():
+        async for index, result in run_batch(items, suggest_batch_item, concurrency, ordered=(order == "input")):
+            yield orjson.dumps({"index": index, **result}) + b"\n"
+    
+    return NDJSONStreamingResponse(lines(), body_read, "/api/suggest_tags/batch")
+
+def upload_result(upload: UploadedFile, description: str) -> Dict:
+    info = upload.info
+    return {
+        "filename": upload.filename,
+        "size_bytes": upload.size,
+        "format": info.format if info else None,
+        "width": info.width if info else None,
+        "height": info.height if info else None,
+        "unit": info.unit if info else None,
+        **suggest_upload_tags(info, description)
+    }
+
+@app.post("/api/suggest_tags/upload")
+async def upload_asset_tag_suggestions(
+    request: Request,
+    filename: str = Query(""),
+    description: str = Query("")
+):
+    """Suggest asset tags for uploaded files from their headers and an optional description.
+
+    Takes multipart/form-data with any number of files and an optional
+    "description" field, or one file as the raw body (?filename=). Files are
+    read as they arrive and never stored; only their first bytes are parsed.
+    """
+    endpoint = "/api/suggest_tags/upload"
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            uploads, fields = await read_multipart(request.stream(), content_type)
+            description = fields.get("description", description)
+        else:
+            uploads = [await read_file(request.stream(), filename)]
+        results = [upload_result(upload, description) for upload in uploads]
+        outcome = "ok"
+        return ORJSONResponse({"files": results})
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnect:
+        outcome = "cancelled"
+        CLIENT_DISCONNECTS.inc(endpoint)
+        return Response(status_code=499)
+    finally:
+        SUGGESTION_SECONDS.observe(time.perf_counter() - start, endpoint, "upload")
+        SUGGESTIONS.inc(endpoint, "upload", outcome)
+
+@on_warm_up
+def warm_up_request_paths():
+    """Run each request path once without upstream calls, so first requests don't pay for it."""
+    request = TagRequest.model_validate({"description": "Finnish HTML5 banner 300x250 for Qashqai", "type": "template"})
+    suggestions = assemble_suggestions(TEMPLATE_MATCHER.scan(request.description))
+    TagSuggestionResponse.model_validate({"suggestions": suggestions})
+    orjson.dumps({"suggestions": suggestions})
+    suggest_asset_tags(request.description)
+    suggest_tags_from_filename("FY24_Q1_FIN_QASHQAI_BANNER_300x250_V1.png")
+    suggest_upload_tags(sniff(b"GIF89a\x2c\x01\xfa\x00"), request.description)
+    TAG_INDEX.search("qash", "auto", DEFAULT_LIMIT)
+    sse_event("final", {"suggestions": suggestions})
+
+mark_loaded()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""Request and per-stage metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain in-process dicts updated without awaiting,
+so recording a sample costs a dict lookup and a bisect. Every uvicorn worker
+keeps its own numbers; when METRICS_DIR is set each worker periodically writes
+a snapshot there and GET /metrics sums the snapshots of all live workers.
+Snapshots left by workers that have exited are deleted when found, so a
+restarted worker or a redeploy does not keep its old counts in the totals.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; sub-millisecond buckets for the in-process stages
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._values)
+
+    @staticmethod
+    def merge(total: Dict, other: Dict) -> None:
+        for labels, value in other.items():
+            total[labels] = total.get(labels, 0.0) + value
+
+    def render(self, values: Dict) -> Iterator[str]:
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (non-cumulative, last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List]:
+        return {labels: [list(counts), total] for labels, (counts, total) in self._values.items()}
+
+    @staticmethod
+    def merge(total: Dict, other: Dict) -> None:
+        for labels, (counts, value_sum) in other.items():
+            entry = total.setdefault(labels, [[0] * len(counts), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += value_sum
+
+    def render(self, values: Dict) -> Iterator[str]:
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, value_sum) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(value_sum)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def dump(self, path: str) -> None:
+        """Write this worker's snapshot as JSON (label tuples become lists)."""
+        data = {name: [[list(labels), value] for labels, value in values.items()]
+                for name, values in self.snapshot().items()}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def collect(self, directory: Optional[str] = None) -> Dict[str, Dict]:
+        """This worker's live values plus the last snapshot of every other running worker."""
+        totals = self.snapshot()
+        if not directory:
+            return totals
+        own_path = worker_snapshot_path(directory)
+        for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+            if path == own_path:
+                continue
+            if not _snapshot_owner_alive(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, entries in data.items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(totals[name], {tuple(labels): value for labels, value in entries})
+        return totals
+
+    def render(self, directory: Optional[str] = None) -> str:
+        totals = self.collect(directory)
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(totals[name]))
+        return "\n".join(lines) + "\n"
+
+
+def worker_snapshot_path(directory: str) -> str:
+    return os.path.join(directory, f"metrics_{os.getpid()}.json")
+
+
+def _snapshot_owner_alive(path: str) -> bool:
+    """Whether the worker that wrote a snapshot (metrics_<pid>.json) is still running."""
+    try:
+        pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Running, under another user
+    return True
+
+
+async def flush_periodically(registry: MetricsRegistry, directory: str, interval: float) -> None:
+    """Background task: keep this worker's snapshot in `directory` fresh."""
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        try:
+            registry.dump(worker_snapshot_path(directory))
+        except OSError as e:
+            logger.warning("Cannot write metrics snapshot", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "taggenie_http_requests_total", "HTTP requests by route, method and status code.", ["endpoint", "method", "status"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "taggenie_http_request_duration_seconds", "HTTP request latency by route.", ["endpoint", "method"])
+SUGGESTIONS = REGISTRY.counter(
+    "taggenie_suggestions_total", "Suggestion requests by endpoint, request type and outcome (ok, is_fallback, error).",
+    ["endpoint", "type", "outcome"])
+KEYWORD_ONLY_FALLBACKS = REGISTRY.counter(
+    "taggenie_keyword_only_fallbacks_total", "Template suggestions made from keywords only because the "
+    "zero-shot call failed, by error type.", ["error"])
+SUGGESTION_SECONDS = REGISTRY.histogram(
+    "taggenie_suggestion_duration_seconds", "Suggestion latency by endpoint and request type.", ["endpoint", "type"])
+CLIENT_DISCONNECTS = REGISTRY.counter(
+    "taggenie_client_disconnects_total", "Requests abandoned by the client before the response was ready; "
+    "their pending work was cancelled.", ["endpoint"])
+UPSTREAM_CANCELLATIONS = REGISTRY.counter(
+    "taggenie_upstream_cancellations_total", "In-flight upstream inference batch calls cancelled because "
+    "no request was waiting for them any more.")
+HEDGED_REQUESTS = REGISTRY.counter(
+    "taggenie_hedged_requests_total", "Upstream inference batch calls that sent a hedged duplicate after "
+    "exceeding the recent latency percentile, by which of the two answered first.", ["winner"])
+LOCAL_RANKER_DECISIONS = REGISTRY.counter(
+    "taggenie_local_ranker_decisions_total", "Template vehicle filters decided by the local ranker without the "
+    "model (local) or left to the model as ambiguous (model).", ["decision"])
+STARTUP_SECONDS = REGISTRY.histogram(
+    "taggenie_startup_seconds", "Worker startup time by phase: loading the app, warm-up, and worker "
+    "start (process start or fork) to ready.", ["phase"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+STAGE_SECONDS = REGISTRY.histogram(
+    "taggenie_stage_duration_seconds", "Time spent in each stage of template tag suggestion.", ["stage"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    def _endpoint(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # Unmatched paths share one label to keep cardinality bounded
+            return "unmatched"
+        path = self._routes.get(endpoint)
+        if path is None:
+            router = scope["app"].router
+            self._routes = {route.endpoint: route.path for route in router.routes if hasattr(route, "endpoint")}
+            path = self._routes.get(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = self._endpoint(scope)
+            HTTP_REQUESTS.inc(endpoint, scope["method"], status)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, scope["method"])
@@ -0,0 +1,78 @@
+"""Static JSON responses serialized, compressed and hashed once.
+
+The body, its gzip variant and its brotli variant are built up front
+together with a content-hash ETag, so serving the payload is a header check
+and a memory copy. Requests carrying a
+matching If-None-Match get an empty 304.
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Installs without brotli (requirements.txt) serve gzip only
+    brotli = None
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    encodings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+
+class PrecompressedJSON:
+    def __init__(self, content: Any, max_age: int = 86400):
+        # Same compact serialization as FastAPI's JSONResponse
+        self.body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                               separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.cache_control = f"public, max-age={max_age}"
+        self.variants: Dict[str, bytes] = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+    def pick_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        # Prefer the smaller variant when both are equally acceptable
+        for coding in ("br", "gzip"):
+            q = accepted.get(coding, wildcard)
+            if coding in self.variants and q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def respond(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if self.not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        encoding = self.pick_encoding(request.headers.get("accept-encoding", ""))
+        body = self.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            body = self.variants[encoding]
+        return Response(body, media_type="application/json", headers=headers)
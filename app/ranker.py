@@ -0,0 +1,203 @@
+"""Local vehicle ranker, trained offline from logged template requests.
+
+The zero-shot model is only asked to settle one thing for a template: its
+vehicle filter. Most descriptions settle it themselves ('... for Qashqai'), so
+the ranker answers those from two tables built from logged descriptions and
+the tags users accepted for them:
+
+- frequency: in how many logged descriptions each token appears
+- co-occurrence: how often each token appeared with each accepted
+  filter/vehicle tag
+
+Build them with
+
+    python -m app.ranker requests.jsonl -o ranker_tables.json
+
+from a JSONL log whose objects carry a "description" and the accepted "tags"
+(or "accepted_tags"); records of other request types, and records without
+accepted tags, are skipped. Point RANKER_TABLES_PATH at the output.
+
+At request time every description token seen at least min_support times is
+evidence for its most frequent vehicle, with precision count / (seen + 1).
+Tokens below 0.5 precision are ignored, strong tokens that point at different
+vehicles make the input ambiguous, and otherwise the best precision is the
+confidence. A description is ranked with one dict lookup per token, and only
+inputs below the confidence threshold go to the model.
+"""
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from app.data_files import read_json
+from app.keyword_matcher import tokenize
+
+TABLES_FORMAT = 1
+VEHICLE_PREFIX = "filter/vehicle/"
+
+# Tokens pointing at a vehicle less often than this carry no evidence
+MIN_EVIDENCE = 0.5
+
+
+def features(description: str) -> Set[str]:
+    """Distinct tokens of a description; numbers alone say nothing about the vehicle."""
+    return {token for token in tokenize(description) if not token.isdigit()}
+
+
+def iter_log(path: str) -> Iterator[Tuple[str, List[str]]]:
+    """(description, accepted tags) of every logged template request, one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or record.get("type", "template") != "template" or record.get("filename"):
+                continue
+            description = record.get("description")
+            tags = record.get("tags", record.get("accepted_tags"))
+            if isinstance(description, str) and description.strip() and isinstance(tags, list):
+                yield description, [tag for tag in tags if isinstance(tag, str)]
+
+
+def build_tables(examples: Iterable[Tuple[str, Sequence[str]]], min_count: int = 5,
+                 max_features: int = 50000) -> Dict:
+    """Frequency and co-occurrence tables of the tokens seen at least min_count times."""
+    records = 0
+    labels: Counter = Counter()
+    seen: Counter = Counter()
+    cooccurrence: Dict[str, Counter] = defaultdict(Counter)
+    for description, tags in examples:
+        records += 1
+        vehicles = sorted({tag for tag in tags if tag.startswith(VEHICLE_PREFIX)})
+        labels.update(vehicles)
+        for feature in features(description):
+            seen[feature] += 1
+            if vehicles:
+                cooccurrence[feature].update(vehicles)
+    kept = [feature for feature, count in seen.most_common(max_features) if count >= min_count]
+    return {
+        "format": TABLES_FORMAT,
+        "records": records,
+        "labels": dict(labels.most_common()),
+        "features": {feature: [seen[feature], dict(cooccurrence[feature].most_common())] for feature in kept}
+    }
+
+
+class Ranker:
+    """Answers the vehicle filter of confident descriptions from precomputed tables."""
+
+    def __init__(self, tables: Dict, threshold: float = 0.9, min_support: int = 20,
+                 labels: Optional[Iterable[str]] = None):
+        if tables.get("format") != TABLES_FORMAT:
+            raise ValueError(f"Unsupported ranker tables format {tables.get('format')!r}, rebuild them")
+        self.threshold = threshold
+        self.min_support = min_support
+        known = set(labels) if labels is not None else None
+        # token -> (best vehicle tag, precision), only for tokens that are evidence
+        self._evidence: Dict[str, Tuple[str, float]] = {}
+        for feature, (count, cooccurrence) in tables["features"].items():
+            if count < min_support:
+                continue
+            candidates = [(hits, label) for label, hits in cooccurrence.items() if known is None or label in known]
+            if not candidates:
+                continue
+            hits, label = max(candidates)
+            precision = hits / (count + 1)
+            if precision >= MIN_EVIDENCE:
+                self._evidence[feature] = (label, precision)
+        self.records = tables.get("records", 0)
+        self.answered = 0
+        self.ambiguous = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "Ranker":
+        return cls(read_json(path), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._evidence)
+
+    def predict(self, description: str) -> Optional[Tuple[str, float]]:
+        """(vehicle tag, confidence) from the strongest evidence, or None if there is none or it conflicts."""
+        best: Optional[Tuple[str, float]] = None
+        for feature in features(description):
+            evidence = self._evidence.get(feature)
+            if evidence is None:
+                continue
+            if best is not None and evidence[0] != best[0]:
+                return None
+            if best is None or evidence[1] > best[1]:
+                best = evidence
+        return best
+
+    def rank(self, description: str) -> Optional[Tuple[str, float]]:
+        """The prediction if it clears the threshold, else None: the model has to decide."""
+        prediction = self.predict(description)
+        if prediction is None or prediction[1] < self.threshold:
+            self.ambiguous += 1
+            return None
+        self.answered += 1
+        return prediction
+
+    def stats(self) -> Dict:
+        return {
+            "records": self.records,
+            "features": len(self._evidence),
+            "threshold": self.threshold,
+            "answered": self.answered,
+            "ambiguous": self.ambiguous
+        }
+
+
+def evaluate(ranker: Ranker, examples: Iterable[Tuple[str, Sequence[str]]]) -> Dict:
+    """Share of examples the ranker would answer without the model, and how often it agrees with the accepted tags."""
+    total = answered = correct = 0
+    for description, tags in examples:
+        total += 1
+        prediction = ranker.predict(description)
+        if prediction is not None and prediction[1] >= ranker.threshold:
+            answered += 1
+            correct += prediction[0] in tags
+    return {
+        "examples": total,
+        "answered": answered,
+        "coverage": round(answered / total, 4) if total else 0.0,
+        "precision": round(correct / answered, 4) if answered else 0.0
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the local ranker's tables from a request log.")
+    parser.add_argument("log", help="JSONL request log with descriptions and accepted tags")
+    parser.add_argument("-o", "--output", required=True, help="tables file (JSON), for RANKER_TABLES_PATH")
+    parser.add_argument("--min-count", type=int, default=5, help="drop tokens seen in fewer descriptions")
+    parser.add_argument("--max-features", type=int, default=50000, help="keep at most this many tokens")
+    parser.add_argument("--holdout", type=int, default=10,
+                        help="evaluate on every Nth record, kept out of the tables (0: evaluate on the training log)")
+    parser.add_argument("--threshold", type=float, default=0.9, help="confidence to evaluate with")
+    parser.add_argument("--min-support", type=int, default=20, help="support to evaluate with")
+    args = parser.parse_args(argv)
+
+    examples = list(iter_log(args.log))
+    if not examples:
+        sys.exit(f"No template requests with accepted tags in {args.log}")
+    if args.holdout > 1:
+        training = [example for i, example in enumerate(examples) if i % args.holdout]
+        holdout = examples[::args.holdout]
+    else:
+        training = holdout = examples
+    tables = build_tables(training, args.min_count, args.max_features)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(tables, f, ensure_ascii=False, separators=(",", ":"))
+
+    ranker = Ranker(tables, threshold=args.threshold, min_support=args.min_support)
+    result = evaluate(ranker, holdout)
+    print(f"Built {args.output} from {tables['records']} requests: {len(tables['features'])} tokens, "
+          f"{len(ranker)} with evidence")
+    print(f"On {result['examples']} held-out requests the model would be skipped for {result['coverage']:.1%}, "
+          f"agreeing with the accepted vehicle {result['precision']:.1%} of the time")
+
+
+if __name__ == "__main__":
+    main()
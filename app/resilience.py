@@ -0,0 +1,186 @@
+"""Request coalescing, a circuit breaker and latency tracking for the inference backend."""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open; the upstream call was skipped."""
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight call.
+
+    The shared call is cancelled once every caller waiting for it has been
+    cancelled, e.g. because their clients disconnected.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._calls.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda done: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            # One caller giving up must not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Nobody is waiting for the result any more. Forget the call now, not
+                # once the cancellation lands, so a new caller starts a fresh one
+                # instead of joining a call that is being cancelled.
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.cancelled += 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "cancelled": self.cancelled,
+                "in_flight": len(self._calls)}
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures or slow calls -> half-open probe.
+
+    While open every call is rejected until `reset_timeout` has passed; then a
+    single probe is let through. A successful probe closes the circuit, a failed
+    one opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_seconds: float = 3.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, elapsed: float = 0.0) -> None:
+        if elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker closed")
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning("Circuit breaker opened", extra={"consecutive_failures": self.consecutive_failures})
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+    def release(self) -> None:
+        """Give up a probe without a verdict (e.g. the call was cancelled)."""
+        self._probe_in_flight = False
+
+    async def call(self, func: Callable[[], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        """Run func through the breaker, timing it to detect slow responses.
+
+        A call cancelled once `deadline` (on the breaker's clock) has passed
+        timed out and counts as a failure; other cancellations, e.g. client
+        disconnects, give no verdict.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit breaker is open; skipping the inference call")
+        start = self._clock()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if deadline is not None and self._clock() >= deadline:
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(self._clock() - start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
+
+class LatencyTracker:
+    """Percentiles over the most recent `window` call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank q-quantile (0 < q <= 1); None until `min_samples` calls were recorded."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
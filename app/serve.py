@@ -0,0 +1,127 @@
+"""Preforking server: load the app once, then fork the uvicorn workers.
+
+    python -m app.serve --host 0.0.0.0 --port 8001 --workers 4
+
+`uvicorn --workers` starts every worker as a fresh interpreter that reads
+.env, the tag hierarchy and car models and builds every matcher and index
+itself. This launcher imports and warms up app.main once in the parent,
+freezes the loaded objects out of the garbage collector, and forks the
+workers, which share those pages copy-on-write. Workers that exit are
+replaced. --no-preload imports the app in each worker instead.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app import startup
+from app.logging_config import configure_logging, stop_logging
+
+# Named explicitly: run with -m, __name__ is "__main__"
+logger = logging.getLogger("app.serve")
+
+APP = "app.main:app"
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    # An explicit IPPROTO_TCP makes asyncio set TCP_NODELAY on accepted connections;
+    # without it every response waits for a delayed ACK (~40 ms)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import and warm up the app in the parent; returns the ASGI app."""
+    start = time.perf_counter()
+    from app.main import app
+    startup.run_warm_up()
+    # Objects that survive a collection are never touched again by the GC, so its
+    # bookkeeping doesn't copy the shared pages into every worker
+    gc.collect()
+    gc.freeze()
+    logger.info("App preloaded", extra={"seconds": round(time.perf_counter() - start, 3),
+                                        "frozen_objects": gc.get_freeze_count()})
+    return app
+
+
+def run_worker(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    startup.after_fork(preloaded=not isinstance(app, str))
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.timeout_keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(app, sock, args)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            # os._exit skips atexit; flush the worker's log queue first
+            stop_logging()
+            os._exit(code)
+    return pid
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="import the app in every worker instead of once in the parent")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--timeout-keep-alive", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    sock = bind_socket(args.host, args.port)
+    app = preload() if args.preload else APP
+    workers = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        workers.add(spawn(app, sock, args))
+    logger.info("Started workers", extra={"workers": args.workers, "preload": args.preload,
+                                          "address": f"{args.host}:{args.port}"})
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            logger.warning("Worker exited, starting a new one", extra={"pid": pid,
+                                                                        "exit_code": os.waitstatus_to_exitcode(status)})
+            workers.add(spawn(app, sock, args))
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""Server-Sent Events framing for the progressive suggestion endpoint."""
+from typing import Any
+
+import orjson
+from starlette.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One SSE message with a JSON payload (orjson never emits raw newlines)."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class EventStreamResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+    def __init__(self, content, **kwargs):
+        super().__init__(content, **kwargs)
+        # Deliver every event as soon as it is written, also through nginx
+        self.headers.setdefault("Cache-Control", "no-cache")
+        self.headers.setdefault("X-Accel-Buffering", "no")
@@ -0,0 +1,83 @@
+"""Worker startup: warm-up hooks, readiness and startup timing.
+
+Modules register warm-up hooks with @on_warm_up. run_warm_up() calls them
+once per process, so when app/serve.py preloads the app and warms it up in
+the parent, forked workers inherit the warmed state and skip it. A worker
+reports ready (GET /readyz) once its lifespan startup has finished.
+"""
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.logging_config import configure_logging
+from app.metrics import STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_warm_up_hooks: List[Callable[[], None]] = []
+
+# perf_counter() when this process started (or was forked off a preloaded parent)
+_started_at = time.perf_counter()
+_timings: Dict[str, float] = {}
+_warmed_up = False
+_ready = False
+_preloaded = False
+
+
+def on_warm_up(func: Callable[[], None]) -> Callable[[], None]:
+    """Register func to run once before the process serves requests."""
+    _warm_up_hooks.append(func)
+    return func
+
+
+def mark_loaded() -> None:
+    """Called when the app module has finished building its shared state."""
+    _timings.setdefault("load", time.perf_counter() - _started_at)
+
+
+def run_warm_up() -> None:
+    global _warmed_up
+    if _warmed_up:
+        return
+    start = time.perf_counter()
+    for hook in _warm_up_hooks:
+        hook()
+    _timings["warm_up"] = time.perf_counter() - start
+    _warmed_up = True
+
+
+def after_fork(preloaded: bool) -> None:
+    """Reset per-process state in a worker forked by app/serve.py."""
+    global _started_at, _preloaded
+    _started_at = time.perf_counter()
+    _preloaded = preloaded
+    # The parent's log writer thread does not exist in the child
+    configure_logging()
+
+
+def mark_ready() -> None:
+    global _ready
+    _timings["worker_ready"] = time.perf_counter() - _started_at
+    _ready = True
+    # Observed in the worker itself, so the multi-worker sums count each worker once
+    for phase, seconds in _timings.items():
+        STARTUP_SECONDS.observe(seconds, phase)
+    logger.info("Worker ready", extra={"pid": os.getpid(), "preloaded": _preloaded,
+                                       **{f"{phase}_seconds": round(seconds, 3) for phase, seconds in _timings.items()}})
+
+
+def mark_stopping() -> None:
+    global _ready
+    _ready = False
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def startup_stats() -> Dict[str, Optional[float]]:
+    return {
+        "preloaded": _preloaded,
+        **{f"{phase}_seconds": round(seconds, 4) for phase, seconds in _timings.items()}
+    }
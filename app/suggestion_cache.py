@@ -0,0 +1,293 @@
+"""Bounded caches for zero-shot classification and suggestion results.
+
+TTLCache is per process: entries are evicted least-recently-used once the
+cache is full and expire after a fixed time to live. Keys combine the
+normalized description with the set of candidate labels, so repeated
+descriptions skip the upstream call.
+
+SQLiteCache is an optional on-disk cache in WAL mode that all workers share
+and that survives restarts. Its entries are keyed by a version hash of the
+data files they were computed from, so editing the hierarchy or the rules
+starts a fresh set of entries, and two revisions sharing the file (e.g.
+during a rolling deploy) never see or delete each other's. Its blocking
+SQLite calls run in executor threads when used from the event loop (aget,
+set_soon). TieredCache puts a TTLCache in front of it.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached values changes
+CACHE_FORMAT = 1
+
+
+def normalize_description(description: str) -> str:
+    """Lowercase and collapse whitespace so trivially different inputs share a key."""
+    return " ".join(description.lower().split())
+
+
+def make_cache_key(description: str, labels: Iterable[str]) -> Tuple[str, Tuple[str, ...]]:
+    return normalize_description(description), tuple(sorted(labels))
+
+
+class TTLCache:
+    """Size-bounded LRU cache with per-entry expiry and hit/miss/eviction counters.
+
+    Operations never await, so they are atomic on the event loop; the lock makes
+    them safe for callers running in executor threads too.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """get() for async callers; in memory, so it never blocks."""
+        return self.get(key)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def cache_version(paths: Iterable[str], *extra: str) -> str:
+    """Hash of the given files' contents (missing files count as empty) and extra strings."""
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            pass
+        digest.update(b"\0")
+    for value in extra:
+        digest.update(value.encode() + b"\0")
+    return digest.hexdigest()[:16]
+
+
+class SQLiteCache:
+    """Cross-process cache in a SQLite database in WAL mode.
+
+    Readers never block the writer, so every worker can use it directly.
+    Expiry uses wall-clock time so entries stay valid across restarts. Once
+    more than `maxsize` entries are stored, the ones closest to expiry (the
+    oldest, of any version) are evicted; that check runs every `evict_every`
+    writes, and expired entries are also purged on connecting. A locked or
+    broken database counts as a miss and never fails a request.
+    """
+
+    def __init__(self, path: str, version: str, maxsize: int = 100000, ttl: float = 3600.0,
+                 evict_every: int = 256, clock=time.time):
+        self.path = path
+        self.version = version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not be used across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=0.05, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                         "expires_at REAL NOT NULL, value BLOB NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            # Entries of other versions may belong to a revision still running; they expire on their own
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (self._clock(),))
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _key(self, key: Hashable) -> str:
+        return orjson.dumps([self.version, key]).decode()
+
+    def _failed(self, operation: str, error: sqlite3.Error) -> None:
+        self.errors += 1
+        logger.warning("Shared cache %s failed", operation, extra={"error": str(error), "path": self.path})
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                    (self._key(key), self._clock())).fetchone()
+            except sqlite3.Error as e:
+                self._failed("read", e)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return orjson.loads(row[0])
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """get() in an executor thread, so a busy database never stalls the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    def set_soon(self, key: Hashable, value: Any) -> None:
+        """set() in an executor thread when called from the event loop; the caller doesn't wait for it."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.set(key, value)
+            return
+        loop.run_in_executor(None, self.set, key, value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO entries (key, version, expires_at, value) VALUES (?, ?, ?, ?)",
+                             (self._key(key), self.version, self._clock() + self.ttl, orjson.dumps(value)))
+                self._writes += 1
+                if self._writes % self.evict_every == 0:
+                    self._evict(conn)
+            except sqlite3.Error as e:
+                self._failed("write", e)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (self._clock(),))
+        excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.maxsize
+        if excess > 0:
+            conn.execute("DELETE FROM entries WHERE key IN "
+                         "(SELECT key FROM entries ORDER BY expires_at LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self) -> None:
+        """Delete this version's entries."""
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE version = ?", (self.version,))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            size = len(self)
+        except sqlite3.Error:
+            size = None
+        return {
+            "path": self.path,
+            "version": self.version,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class TieredCache:
+    """A per-process TTLCache in front of a shared cache, with the same interface.
+
+    Shared hits are copied into the local cache; sets go to both. Use aget
+    on the event loop: get blocks on the shared cache.
+    """
+
+    def __init__(self, local: TTLCache, shared: SQLiteCache, namespace: str):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get((self.namespace, key))
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is None:
+            value = await self.shared.aget((self.namespace, key))
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.local.set(key, value)
+        self.shared.set_soon((self.namespace, key), value)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.local.stats(), "shared": self.shared.stats()}
@@ -0,0 +1,92 @@
+"""Search index over every full tag path, for autocomplete.
+
+Built once at load time from the tag hierarchy and car models:
+
+- prefix: a sorted array of lowercased paths, searched with bisect
+- segment: a sorted array of (segment, path) pairs, so "qash" finds every path
+  with a segment starting with it, wherever the segment is
+- fuzzy: a symmetric-delete index over the segments (app/typo_index.py), so
+  typos are matched with a few dict lookups instead of an edit distance
+  against every segment
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.tag_paths import iter_car_model_paths, iter_tag_paths
+from app.typo_index import TypoIndex
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class TagIndex:
+    def __init__(self, paths: Iterable[str]):
+        self.paths: List[str] = sorted(dict.fromkeys(paths), key=str.lower)
+        self._keys = [path.lower() for path in self.paths]
+        segments: Dict[str, List[int]] = {}
+        for i, key in enumerate(self._keys):
+            for segment in dict.fromkeys(key.split('/')):
+                segments.setdefault(segment, []).append(i)
+        self._segments = segments
+        self._segment_keys: List[Tuple[str, int]] = sorted(
+            (segment, i) for segment, ids in segments.items() for i in ids)
+        self._typos = TypoIndex(segments)
+
+    @classmethod
+    def from_hierarchy(cls, tag_hierarchy: Dict, car_models: Optional[Dict] = None) -> "TagIndex":
+        paths = list(iter_tag_paths(tag_hierarchy))
+        if car_models:
+            paths.extend(iter_car_model_paths(car_models))
+        return cls(paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def prefix(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Paths starting with query, e.g. 'system/si' -> 'system/size/...'."""
+        query = query.lower()
+        results = []
+        for i in range(bisect_left(self._keys, query), len(self._keys)):
+            if not self._keys[i].startswith(query) or len(results) >= limit:
+                break
+            results.append(self.paths[i])
+        return results
+
+    def segment(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Paths with any segment starting with query, e.g. 'qash' -> 'filter/vehicle/qashqai'."""
+        query = query.lower()
+        ids: Dict[int, None] = {}
+        for n in range(bisect_left(self._segment_keys, (query, -1)), len(self._segment_keys)):
+            segment, i = self._segment_keys[n]
+            if not segment.startswith(query):
+                break
+            ids[i] = None
+        return [self.paths[i] for i in sorted(ids)[:limit]]
+
+    def fuzzy(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Paths with a segment within a few typos of query, closest segments first."""
+        ids: Dict[int, None] = {}
+        for segment, _ in self._typos.candidates(query.lower()):
+            for i in self._segments[segment]:
+                ids[i] = None
+                if len(ids) >= limit:
+                    return [self.paths[i] for i in ids]
+        return [self.paths[i] for i in ids]
+
+    def search(self, query: str, mode: str = "auto", limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Run one query mode, or with mode='auto' prefix, then segment, then fuzzy matches."""
+        query = query.strip().strip('/')
+        if not query:
+            return []
+        if mode == "prefix":
+            return self.prefix(query, limit)
+        if mode == "segment":
+            return self.segment(query, limit)
+        if mode == "fuzzy":
+            return self.fuzzy(query, limit)
+        results = dict.fromkeys(self.prefix(query, limit))
+        if len(results) < limit and '/' not in query:
+            results.update(dict.fromkeys(self.segment(query, limit)))
+        if not results:
+            results.update(dict.fromkeys(self.fuzzy(query, limit)))
+        return list(results)[:limit]
@@ -0,0 +1,24 @@
+"""Enumerate the full tag paths defined by tag_hierarchy.json and car_models.json."""
+from typing import Dict, Iterator
+
+
+def iter_tag_paths(tag_hierarchy: Dict, prefix: str = "") -> Iterator[str]:
+    """Yield every full tag path, e.g. 'filter/vehicle/qashqai' or 'system/size/a4'.
+
+    'categories' and 'subcategories' group entries without being path segments.
+    """
+    for key, value in tag_hierarchy.items():
+        path = prefix if key in ("categories", "subcategories") else f"{prefix}{key}/"
+        if isinstance(value, dict):
+            yield from iter_tag_paths(value, path)
+        elif isinstance(value, list):
+            for item in value:
+                yield f"{path}{item}"
+
+
+def iter_car_model_paths(car_models: Dict) -> Iterator[str]:
+    """Yield car/model/<model> and car/model/<model>/<year> paths."""
+    for model, info in car_models.items():
+        yield f"car/model/{model}"
+        for year in info.get('years', []):
+            yield f"car/model/{model}/{year}"
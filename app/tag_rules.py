@@ -0,0 +1,137 @@
+"""Keyword and media/size rules for template tag suggestions.
+
+The rules are defined in tag_rules.json next to tag_hierarchy.json. They are
+validated against the hierarchy and compiled once into read-only structures,
+together with the low-confidence "all options" suggestions, so suggest_tags
+only does lookups per request.
+"""
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+from app.data_files import TAG_RULES_PATH, load_tag_hierarchy, read_json
+
+# Confidence used when every option of a category is suggested
+ALL_OPTIONS_CONFIDENCE = 0.5
+
+
+class MediaRule(NamedTuple):
+    valid_sizes: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+    comment: str
+
+
+class TagRules(NamedTuple):
+    """Compiled rule set. Suggestion payloads are shared and must not be mutated."""
+    candidate_vehicles: Tuple[str, ...]
+    candidate_languages: Tuple[str, ...]
+    candidate_media: Tuple[str, ...]
+    social_media_keywords: Tuple[str, ...]
+    fuzzy_ignore: Tuple[str, ...]
+    media: Mapping[str, MediaRule]
+    sizes: Mapping[str, Tuple[str, ...]]
+    vehicles: Mapping[str, Mapping[str, Tuple[str, ...]]]
+    languages: Mapping[str, Tuple[str, ...]]
+    price_lectern_descriptions: Mapping[str, str]
+    all_filters: Dict
+    all_media: Dict
+    all_sizes: Dict
+    all_languages: Dict
+    media_sizes: Mapping[str, Dict]
+    banner_size: Dict
+
+
+def all_options(category: str, tags: Iterable[str]) -> Dict:
+    """Suggestion payload offering every tag of a category at low confidence."""
+    return {
+        "category": category,
+        "suggested_tags": tuple(tags),
+        "confidence": ALL_OPTIONS_CONFIDENCE
+    }
+
+
+def _keyword_table(table: Dict[str, List[str]], name: str, errors: List[str]) -> Mapping[str, Tuple[str, ...]]:
+    if not isinstance(table, dict) or not table:
+        errors.append(f"{name} must be a non-empty object")
+        return MappingProxyType({})
+    for label, keywords in table.items():
+        if not isinstance(keywords, list) or not keywords or not all(isinstance(k, str) and k for k in keywords):
+            errors.append(f"{name}.{label} must be a non-empty list of keywords")
+    return MappingProxyType({label: tuple(keywords) for label, keywords in table.items()})
+
+
+def _check_known(labels: Iterable[str], known: Iterable[str], name: str, errors: List[str]) -> None:
+    unknown = [label for label in labels if label not in known]
+    if unknown:
+        errors.append(f"{name} not in tag hierarchy: {', '.join(unknown)}")
+
+
+def compile_tag_rules(raw: Dict, tag_hierarchy: Dict) -> TagRules:
+    """Validate raw rules against the tag hierarchy and freeze them."""
+    errors: List[str] = []
+    candidates = raw.get('candidate_labels', {})
+    media_raw = raw.get('media', {})
+
+    sizes = _keyword_table(raw.get('sizes'), 'sizes', errors)
+    languages = _keyword_table(raw.get('languages'), 'languages', errors)
+    vehicles = MappingProxyType({
+        subcategory: _keyword_table(models, f"vehicles.{subcategory}", errors)
+        for subcategory, models in raw.get('vehicles', {}).items()
+    })
+    if 'vehicle' not in vehicles:
+        errors.append("vehicles must define the 'vehicle' subcategory")
+
+    media = {}
+    for media_type, config in media_raw.items():
+        keywords = config.get('keywords') or []
+        valid_sizes = config.get('valid_sizes', [])
+        if not keywords:
+            errors.append(f"media.{media_type} has no keywords")
+        _check_known(valid_sizes, sizes, f"media.{media_type}.valid_sizes", errors)
+        media[media_type] = MediaRule(tuple(valid_sizes), tuple(keywords), config.get('comment', ''))
+    if not media:
+        errors.append("media must be a non-empty object")
+
+    fuzzy_ignore = raw.get('fuzzy_ignore', [])
+    if not isinstance(fuzzy_ignore, list) or not all(isinstance(word, str) and word for word in fuzzy_ignore):
+        errors.append("fuzzy_ignore must be a list of words")
+
+    filters = tag_hierarchy['filter']['subcategories']
+    _check_known(media, tag_hierarchy['system']['media'], "media", errors)
+    _check_known(sizes, tag_hierarchy['system']['size'], "sizes", errors)
+    _check_known(languages, tag_hierarchy['language'], "languages", errors)
+    _check_known(vehicles, filters, "vehicles", errors)
+    for subcategory, models in vehicles.items():
+        _check_known(models, filters.get(subcategory, []), f"vehicles.{subcategory}", errors)
+
+    if errors:
+        raise ValueError("Invalid tag rules: " + "; ".join(errors))
+
+    return TagRules(
+        candidate_vehicles=tuple(candidates.get('vehicle', [])),
+        candidate_languages=tuple(candidates.get('language', [])),
+        candidate_media=tuple(candidates.get('media', [])),
+        social_media_keywords=tuple(raw.get('social_media_keywords', [])),
+        fuzzy_ignore=tuple(fuzzy_ignore),
+        media=MappingProxyType(media),
+        sizes=sizes,
+        vehicles=vehicles,
+        languages=languages,
+        price_lectern_descriptions=MappingProxyType(dict(raw.get('price_lectern_descriptions', {}))),
+        all_filters=all_options("filter", [
+            f"filter/{subcategory}/{model}" for subcategory, models in vehicles.items() for model in models
+        ]),
+        all_media=all_options("system/media", [f"system/media/{media_type}" for media_type in media]),
+        all_sizes=all_options("system/size", [f"system/size/{size}" for size in sizes]),
+        all_languages=all_options("language", [f"language/{lang}" for lang in languages]),
+        media_sizes=MappingProxyType({
+            media_type: all_options("system/size", [f"system/size/{size}" for size in rule.valid_sizes])
+            for media_type, rule in media.items() if rule.valid_sizes
+        }),
+        banner_size=all_options("banner/size", ["banner/size/<width>x<height>"])
+    )
+
+
+@lru_cache(maxsize=1)
+def load_tag_rules() -> TagRules:
+    return compile_tag_rules(read_json(TAG_RULES_PATH), load_tag_hierarchy())
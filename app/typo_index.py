@@ -0,0 +1,88 @@
+"""Typo-tolerant word lookup with a symmetric-delete index (as in SymSpell).
+
+Every dictionary word is stored under each string obtained by deleting up to
+MAX_EDITS of its characters. A query's own deletes are looked up in that dict
+and only the few words sharing one are checked with an edit distance, so a
+lookup costs a few dozen dict probes however large the dictionary is.
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MAX_EDITS = 2
+
+
+def max_edits_for(query: str, min_length: int = 4) -> int:
+    """Allowed typos grow with the query length; queries shorter than min_length must be exact."""
+    if len(query) < min_length:
+        return 0
+    return 1 if len(query) < min_length + 3 else MAX_EDITS
+
+
+def deletes(word: str, max_edits: int) -> Set[str]:
+    """Every string obtained by removing up to max_edits characters from word."""
+    variants = {word}
+    for n in range(1, min(max_edits, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), n):
+            variants.add("".join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TypoIndex:
+    """Dictionary words findable within max_edits_for(query, min_length) typos."""
+
+    def __init__(self, words: Iterable[str], min_length: int = 4, cache_size: int = 4096):
+        self.min_length = min_length
+        self.words = frozenset(words)
+        # Longer queries are more than MAX_EDITS typos away from every word; deletes()
+        # grows with the cube of the query length, so they are never expanded
+        self.max_query_length = max(map(len, self.words), default=0) + MAX_EDITS
+        self._deletes: Dict[str, List[str]] = {}
+        for word in sorted(self.words):
+            for variant in deletes(word, MAX_EDITS):
+                self._deletes.setdefault(variant, []).append(word)
+        # Descriptions repeat the same few unknown words
+        self.correct = lru_cache(maxsize=cache_size)(self._correct)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def candidates(self, query: str) -> List[Tuple[str, int]]:
+        """(word, distance) within the allowed typos of query, closest first, then alphabetical."""
+        if len(query) > self.max_query_length:
+            return []
+        max_edits = max_edits_for(query, self.min_length)
+        if not max_edits:
+            return [(query, 0)] if query in self.words else []
+        distances: Dict[str, int] = {}
+        for variant in deletes(query, max_edits):
+            for word in self._deletes.get(variant, ()):
+                if word not in distances:
+                    distances[word] = edit_distance(query, word, max_edits)
+        return sorted(((word, d) for word, d in distances.items() if d <= max_edits), key=lambda item: (item[1], item[0]))
+
+    def _correct(self, query: str) -> Optional[str]:
+        """The one closest word, or None if there is none or it is ambiguous."""
+        found = self.candidates(query)
+        if not found or len(found) > 1 and found[0][1] == found[1][1]:
+            return None
+        return found[0][0]
@@ -0,0 +1,62 @@
+"""Filenames per second through the filename grammar.
+
+Run from the repository root:
+
+    python benchmarks/bench_filename_parser.py
+
+The corpus is convention names from benchmarks/corpus.py plus one in five
+malformed names (truncated or shuffled), which parse to partial results.
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.bulk_tagger import tag_chunk  # noqa: E402
+from app.filename_parser import parse_filename, parse_filenames, suggest_tags_from_filename  # noqa: E402
+from benchmarks import corpus  # noqa: E402
+
+CORPUS_SIZE = 50000
+ROUNDS = 3
+
+
+def build_corpus():
+    rng = random.Random(7)
+    names = corpus.filenames(CORPUS_SIZE)
+    for i in range(0, len(names), 5):
+        parts = names[i].split("_")
+        if rng.random() < 0.5:
+            names[i] = "_".join(parts[:rng.randint(1, 2)])
+        else:
+            rng.shuffle(parts)
+            names[i] = "_".join(parts)
+    return names
+
+
+def rate(func, names):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(names)
+        best = min(best, time.perf_counter() - start)
+    return len(names) / best
+
+
+def main():
+    names = build_corpus()
+    cases = {
+        "parse_filename (loop)": lambda batch: [parse_filename(name) for name in batch],
+        "parse_filenames (batch)": parse_filenames,
+        "suggest_tags_from_filename": lambda batch: [suggest_tags_from_filename(name) for name in batch],
+        "bulk_tagger.tag_chunk": tag_chunk,
+    }
+    print(f"{len(names)} filenames, best of {ROUNDS}")
+    for name, func in cases.items():
+        print(f"{name:<28} {rate(func, names):>12,.0f} filenames/s")
+
+
+if __name__ == "__main__":
+    main()
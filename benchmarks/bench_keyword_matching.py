@@ -0,0 +1,81 @@
+"""Compare the compiled keyword matcher with the old per-keyword substring scans.
+
+Run from the repository root:
+
+    python benchmarks/bench_keyword_matching.py
+
+Prints the per-request CPU time of both approaches for growing description
+lengths. The substring scans grow with (description length x keyword count);
+the single-pass matcher only grows with the description length.
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(os.path.join(ROOT, "app"))
+os.environ.setdefault("HUGGINGFACE_API_KEY", "benchmark")
+
+from app import tag_suggester  # noqa: E402
+
+# Filler prose with a handful of tagging keywords, like a real campaign brief
+FILLER = (
+    "the spring campaign highlights our dealer offers with bold imagery and a clear "
+    "call to action for customers visiting the showroom this season while keeping "
+    "the brand guidelines intact across every channel and market we operate in"
+).split()
+KEYWORDS = ["finnish", "print", "qashqai", "half page", "instagram story", "x-trail", "banner"]
+LENGTHS = [50, 200, 1000, 5000]
+ROUNDS = 200
+
+
+def legacy_scan(description: str) -> None:
+    """The keyword checks suggest_tags used to run, one substring scan at a time."""
+    rules = tag_suggester.TAG_RULES
+    description_lower = description.lower()
+    any(v in description_lower for v in rules.candidate_vehicles)
+    any(lang in description_lower for lang in rules.candidate_languages)
+    any(media in description_lower for media in rules.candidate_media)
+    any(k in description_lower for k in rules.social_media_keywords)
+    for rule in rules.media.values():
+        if any(k in description_lower for k in rule.keywords):
+            break
+    for keywords in rules.languages.values():
+        if any(f" {k} " in f" {description_lower} " for k in keywords):
+            break
+    for keywords in rules.vehicles['vehicle'].values():
+        if any(k in description_lower for k in keywords):
+            break
+    for keywords in rules.sizes.values():
+        any(k in description_lower for k in keywords)
+
+
+def make_description(length: int, rng: random.Random) -> str:
+    words = rng.sample(KEYWORDS, 3)
+    while sum(len(w) + 1 for w in words) < length:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLER))
+    return " ".join(words)
+
+
+def cpu_time_per_call(func, descriptions) -> float:
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        for description in descriptions:
+            func(description)
+    return (time.process_time() - start) / (ROUNDS * len(descriptions))
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'chars':>6} {'legacy us':>10} {'matcher us':>11} {'speedup':>8}")
+    for length in LENGTHS:
+        descriptions = [make_description(length, rng) for _ in range(20)]
+        legacy = cpu_time_per_call(legacy_scan, descriptions)
+        compiled = cpu_time_per_call(tag_suggester.TEMPLATE_MATCHER.scan, descriptions)
+        print(f"{length:>6} {legacy * 1e6:>10.1f} {compiled * 1e6:>11.1f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
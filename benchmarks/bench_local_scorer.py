@@ -0,0 +1,127 @@
+"""Latency of the local zero-shot scorer, and its agreement with the remote model.
+
+Run from the repository root:
+
+    python benchmarks/bench_local_scorer.py
+    HUGGINGFACE_API_KEY=... python benchmarks/bench_local_scorer.py --remote
+
+Without --remote only the local scorer is timed. With --remote every
+description is also sent to the Hugging Face API, and the script reports
+remote latency plus how often both backends agree on the best label of each
+category and on which labels clear the 0.5 threshold suggest_tags uses.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(os.path.join(ROOT, "app"))
+
+from app.local_scorer import LocalScorer  # noqa: E402
+from app.tag_rules import load_tag_rules  # noqa: E402
+
+DESCRIPTIONS = [
+    "Finnish print ad for the new Qashqai, half page",
+    "Instagram story for X-Trail in Swedish",
+    "Price lectern for Juke",
+    "Spring service campaign newsletter for dealers",
+    "HTML5 banner for Ariya, Norwegian",
+    "Danish direct mail about the Leaf",
+    "Estonian point of sale poster for Micra",
+    "Latvian digital screen loop for the Qashqai",
+    "Lithuanian full page print ad for Juke",
+    "Russian email about the new X-Trail",
+    "English LinkedIn ad for fleet customers",
+    "Winter tyres campaign banner",
+]
+ROUNDS = 200
+
+
+def candidate_labels(rules):
+    return ([f"filter/vehicle/{v}" for v in rules.candidate_vehicles]
+            + [f"language/{lang}" for lang in rules.candidate_languages]
+            + [f"system/media/{m}" for m in rules.candidate_media])
+
+
+def best_per_category(labels, scores):
+    best = {}
+    for label, score in zip(labels, scores):
+        category = label.rsplit('/', 1)[0]
+        if category not in best or score > best[category][1]:
+            best[category] = (label, score)
+    return {category: label for category, (label, _) in best.items()}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in (50, 95, 99)}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--remote", action="store_true", help="also query the Hugging Face API")
+    args = parser.parse_args()
+
+    rules = load_tag_rules()
+    with open("tag_hierarchy.json") as f:
+        hierarchy = json.load(f)
+    with open("../car_models.json") as f:
+        car_models = json.load(f)
+
+    start = time.perf_counter()
+    scorer = LocalScorer.from_hierarchy(hierarchy, rules, car_models)
+    print(f"local: built {scorer._matrix.shape[0]} prototypes in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    labels = candidate_labels(rules)
+    timings = []
+    for _ in range(ROUNDS):
+        for description in DESCRIPTIONS:
+            start = time.perf_counter()
+            await scorer.classify(description, labels)
+            timings.append(time.perf_counter() - start)
+    p = percentiles(timings)
+    print(f"local single: p50 {p[50] * 1e6:.0f} us, p95 {p[95] * 1e6:.0f} us, p99 {p[99] * 1e6:.0f} us")
+
+    batch = DESCRIPTIONS * 100
+    start = time.perf_counter()
+    scorer.score_batch(batch, labels)
+    elapsed = time.perf_counter() - start
+    print(f"local batch of {len(batch)}: {elapsed * 1e3:.1f} ms ({elapsed / len(batch) * 1e6:.0f} us/description)")
+
+    if not args.remote:
+        return
+
+    from app.inference_client import InferenceClient
+    from app.tag_suggester import API_URL
+
+    client = InferenceClient(API_URL, os.environ["HUGGINGFACE_API_KEY"], timeout=30)
+    remote_timings, top_agree, top_total, threshold_agree, threshold_total = [], 0, 0, 0, 0
+    for description in DESCRIPTIONS:
+        start = time.perf_counter()
+        remote_labels, remote_scores = await client.classify(description, labels)
+        remote_timings.append(time.perf_counter() - start)
+        local_labels, local_scores = await scorer.classify(description, labels)
+
+        remote_best = best_per_category(remote_labels, remote_scores)
+        local_best = best_per_category(local_labels, local_scores)
+        top_agree += sum(remote_best[c] == local_best.get(c) for c in remote_best)
+        top_total += len(remote_best)
+
+        remote_hits = {label for label, score in zip(remote_labels, remote_scores) if score > 0.5}
+        local_hits = {label for label, score in zip(local_labels, local_scores) if score > 0.5}
+        threshold_agree += sum((label in remote_hits) == (label in local_hits) for label in labels)
+        threshold_total += len(labels)
+    await client.aclose()
+
+    print(f"remote: mean {statistics.mean(remote_timings) * 1e3:.0f} ms, max {max(remote_timings) * 1e3:.0f} ms")
+    print(f"agreement: best label per category {top_agree / top_total:.0%}, "
+          f"above-0.5 decisions {threshold_agree / threshold_total:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
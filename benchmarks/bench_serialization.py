@@ -0,0 +1,72 @@
+"""Serialization time per suggestion response: FastAPI's default path vs orjson.
+
+Run from the repository root:
+
+    python benchmarks/bench_serialization.py
+
+"default" is what FastAPI does with a plain dict returned from an endpoint:
+jsonable_encoder followed by JSONResponse (the standard json module).
+"orjson" is ORJSONResponse rendering the dict directly, as /api/suggest_tags
+now does.
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(os.path.join(ROOT, "app"))
+os.environ.setdefault("HUGGINGFACE_API_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+with contextlib.redirect_stdout(open(os.devnull, "w")):
+    from app import tag_suggester  # noqa: E402
+from app.asset_tags_suggester import suggest_asset_tags  # noqa: E402
+from app.filename_parser import suggest_tags_from_filename  # noqa: E402
+
+ROUNDS = 20000
+
+
+class StubInference:
+    async def classify(self, description, labels):
+        return list(labels), [0.3] * len(labels)
+
+
+def default_render(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def orjson_render(content):
+    return ORJSONResponse(content).body
+
+
+def timed(func, content):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(content)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def main():
+    tag_suggester.inference_client = StubInference()
+    responses = {
+        "template (pricelectern)": asyncio.run(tag_suggester.suggest_tags("Finnish price lectern for Qashqai")),
+        "template (banner)": asyncio.run(tag_suggester.suggest_tags("HTML5 banner for Ariya, norwegian")),
+        "template (no match)": asyncio.run(tag_suggester.suggest_tags("Spring campaign")),
+        "asset": suggest_asset_tags("dealer logo for Qashqai, finnish"),
+        "filename": suggest_tags_from_filename("FY24_Q1_FIN_QASHQAI_BANNER_300x250_V1.png"),
+    }
+    print(f"{'response':<26} {'bytes':>6} {'default us':>11} {'orjson us':>10} {'speedup':>8}")
+    for name, content in responses.items():
+        default_us = timed(default_render, content)
+        orjson_us = timed(orjson_render, content)
+        size = len(orjson_render(content))
+        print(f"{name:<26} {size:>6} {default_us:>11.2f} {orjson_us:>10.2f} {default_us / orjson_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-request time and allocations of suggest_tags with the network stubbed out.
+
+Run from the repository root:
+
+    python benchmarks/bench_suggest_tags.py
+
+The Hugging Face call is replaced by a canned response, so the numbers only
+cover candidate building, keyword matching and response assembly.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(os.path.join(ROOT, "app"))
+os.environ.setdefault("HUGGINGFACE_API_KEY", "benchmark")
+
+from app import tag_suggester  # noqa: E402
+
+DESCRIPTIONS = [
+    "Finnish print ad for the new Qashqai, half page",
+    "Instagram story for X-Trail in Swedish",
+    "Price lectern for Juke",
+    "Spring service campaign for dealers",
+    "HTML5 banner for Ariya, norwegian",
+    "Newsletter about winter tyres",
+]
+ROUNDS = 2000
+
+
+async def _stub_classify_batch(description, labels):
+    return labels, [0.42] * len(labels)
+
+
+async def main():
+    tag_suggester.inference_client.classify_batch = _stub_classify_batch
+    with contextlib.redirect_stdout(io.StringIO()):
+        for description in DESCRIPTIONS:
+            await tag_suggester.suggest_tags(description)
+
+        tracemalloc.start()
+        peaks = []
+        for description in DESCRIPTIONS:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await tag_suggester.suggest_tags(description)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for description in DESCRIPTIONS:
+                await tag_suggester.suggest_tags(description)
+        elapsed = time.perf_counter() - start
+
+    calls = ROUNDS * len(DESCRIPTIONS)
+    print(f"suggest_tags: {elapsed / calls * 1e6:.1f} us/request")
+    print(f"peak allocation: {sum(peaks) / len(peaks):.0f} B/request (max {max(peaks)} B)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
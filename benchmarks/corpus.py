@@ -0,0 +1,90 @@
+"""Deterministic corpus of template/asset descriptions and filenames.
+
+Descriptions mix local-language phrasing with the English tagging vocabulary
+the way briefs in all nine supported languages do. Filenames follow the
+FY/quarter/project/language/vehicle/media/dimension/version convention.
+"""
+import random
+from typing import Dict, List
+
+# Phrasing per language: a language marker, a few filler phrases and "for"
+LANGUAGES: Dict[str, Dict] = {
+    "english": {"code": "ENG", "marker": "English", "for": "for",
+                "filler": ["new spring campaign", "dealer offer", "limited time price", "service reminder"]},
+    "finnish": {"code": "FIN", "marker": "suomenkielinen", "for": "mallille",
+                "filler": ["uusi kevätkampanja", "jälleenmyyjän tarjous", "rajoitettu hinta", "huoltomuistutus"]},
+    "swedish": {"code": "SWE", "marker": "Swedish", "for": "för",
+                "filler": ["ny vårkampanj", "återförsäljarerbjudande", "tidsbegränsat pris", "servicepåminnelse"]},
+    "norwegian": {"code": "NOR", "marker": "Norwegian", "for": "for",
+                  "filler": ["ny vårkampanje", "forhandlertilbud", "tidsbegrenset pris", "servicepåminnelse"]},
+    "danish": {"code": "DAN", "marker": "Danish", "for": "til",
+               "filler": ["ny forårskampagne", "forhandlertilbud", "tidsbegrænset pris", "servicepåmindelse"]},
+    "estonian": {"code": "EST", "marker": "Estonian", "for": "jaoks",
+                 "filler": ["uus kevadkampaania", "edasimüüja pakkumine", "piiratud hind", "hoolduse meeldetuletus"]},
+    "latvian": {"code": "LAT", "marker": "Latvian", "for": "priekš",
+                "filler": ["jauna pavasara kampaņa", "dīlera piedāvājums", "ierobežota cena", "apkopes atgādinājums"]},
+    "lithuanian": {"code": "LIT", "marker": "Lithuanian", "for": "skirta",
+                   "filler": ["nauja pavasario kampanija", "pardavėjo pasiūlymas", "ribota kaina", "aptarnavimo priminimas"]},
+    "russian": {"code": "RUS", "marker": "venäjä", "for": "для",
+                "filler": ["новая весенняя кампания", "предложение дилера", "ограниченная цена", "напоминание о сервисе"]},
+}
+
+VEHICLES = ["Qashqai", "Juke", "X-Trail", "Leaf", "Micra", "Ariya", "Navara", "Townstar", "Interstar", "Primastar"]
+TEMPLATE_MEDIA = ["print ad, half page", "full page print", "HTML5 banner", "newsletter", "direct mail",
+                  "price lectern", "point of sale poster", "digital screen loop", "Instagram story",
+                  "LinkedIn ad", "A4 leaflet", "after sales social media post"]
+ASSET_TYPES = ["packshot", "dealer logo", "award logo", "energy label", "QR code", "warranty logo",
+               "baseplate", "customer promise", "social media logo", "car logo"]
+FILENAME_MEDIA = ["BANNER", "PRINT", "STORY"]
+DIMENSIONS = ["300x250", "970x250", "728x90", "160x600", "1080x1920", "210x297"]
+
+
+def template_requests(count: int, seed: int = 1) -> List[Dict]:
+    """Template requests as a request log would record them, with the accepted vehicle tag."""
+    rng = random.Random(seed)
+    languages = list(LANGUAGES.values())
+    result = []
+    for i in range(count):
+        lang = languages[i % len(languages)]
+        media = rng.choice(TEMPLATE_MEDIA)
+        vehicle = rng.choice(VEHICLES)
+        parts = [lang["marker"], media, lang["for"], vehicle]
+        if rng.random() < 0.6:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(lang["filler"]))
+        result.append({"description": " ".join(parts), "type": "template",
+                       "tags": [f"filter/vehicle/{vehicle.lower()}"]})
+    return result
+
+
+def template_descriptions(count: int, seed: int = 1) -> List[str]:
+    return [request["description"] for request in template_requests(count, seed)]
+
+
+def asset_descriptions(count: int, seed: int = 2) -> List[str]:
+    rng = random.Random(seed)
+    languages = list(LANGUAGES.values())
+    result = []
+    for i in range(count):
+        lang = languages[i % len(languages)]
+        parts = [rng.choice(ASSET_TYPES), lang["for"], rng.choice(VEHICLES), lang["marker"]]
+        result.append(" ".join(parts))
+    return result
+
+
+def filenames(count: int, seed: int = 3) -> List[str]:
+    rng = random.Random(seed)
+    codes = [lang["code"] for lang in LANGUAGES.values()]
+    result = []
+    for i in range(count):
+        parts = [f"FY{rng.randint(22, 26)}", f"Q{rng.randint(1, 4)}"]
+        if rng.random() < 0.3:
+            parts.append(rng.choice(["CCL", "MASTER"]))
+        parts.append(codes[i % len(codes)])
+        parts.extend(v.upper().replace("-", "") for v in rng.sample(VEHICLES, rng.randint(1, 2)))
+        media = rng.choice(FILENAME_MEDIA)
+        parts.append(media)
+        if media == "BANNER" or rng.random() < 0.3:
+            parts.append(rng.choice(DIMENSIONS))
+        parts.append(f"V{rng.randint(1, 9)}")
+        result.append("_".join(parts) + rng.choice([".png", ".jpg", ".pdf", ".zip"]))
+    return result
@@ -0,0 +1,228 @@
+"""Load test of the API against a local mock of the inference endpoint.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py --workers 4 --concurrency 64 --duration 30 --latency 1-5
+
+Starts benchmarks/mock_inference.py and the app (python -m app.serve) on
+local ports, waits until the workers are ready, and then keeps --concurrency
+requests in flight against /api/suggest_tags for --duration seconds. The
+traffic mixes template, asset and filename requests (--mix) drawn from the
+benchmark corpus. Reports throughput, latency percentiles per request type,
+and the fallback rate: error responses plus template responses that fell back
+to keyword matching, as counted in the app's /metrics. --ranker first trains
+the local vehicle ranker (app/ranker.py) on a separate corpus log, so the
+upstream call counts and latencies can be compared with a run without it.
+--url runs the same traffic against an already running deployment instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.ranker import build_tables  # noqa: E402
+from benchmarks import corpus  # noqa: E402
+
+REQUEST_TYPES = ("template", "asset", "filename")
+
+
+def parse_mix(text: str):
+    weights = dict.fromkeys(REQUEST_TYPES, 0.0)
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"Unknown request type {name!r}")
+        weights[name] = float(weight)
+    return weights
+
+
+def percentile(ordered, q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def metric_total(text: str, name: str) -> float:
+    """Sum of every sample of one metric in Prometheus text format."""
+    return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith(name) and line[len(name)] in "{ ")
+
+
+class Traffic:
+    def __init__(self, mix, corpus_size: int, seed: int):
+        self.rng = random.Random(seed)
+        self.types = list(mix)
+        self.weights = list(mix.values())
+        self.templates = corpus.template_descriptions(corpus_size)
+        self.assets = corpus.asset_descriptions(corpus_size)
+        self.filenames = corpus.filenames(corpus_size)
+
+    def next(self):
+        request_type = self.rng.choices(self.types, self.weights)[0]
+        if request_type == "template":
+            return request_type, {"description": self.rng.choice(self.templates), "type": "template"}
+        if request_type == "asset":
+            return request_type, {"description": self.rng.choice(self.assets), "type": "asset"}
+        return request_type, {"description": "", "type": "template", "filename": self.rng.choice(self.filenames)}
+
+
+async def drive(url: str, traffic: Traffic, concurrency: int, duration: float):
+    """Closed loop: `concurrency` clients each send their next request when the last one returns."""
+    results = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                request_type, body = traffic.next()
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/suggest_tags", json=body)
+                    status = response.status_code
+                    is_fallback = status != 200 or bool(response.json().get("is_fallback"))
+                except httpx.HTTPError:
+                    status, is_fallback = None, True
+                results.append((request_type, time.perf_counter() - start, status, is_fallback))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        try:
+            metrics = (await client.get("/metrics")).text
+        except httpx.HTTPError:
+            metrics = ""
+    return results, elapsed, metrics
+
+
+def report(results, elapsed: float, keyword_only: float, upstream_stats) -> dict:
+    by_type = defaultdict(list)
+    for result in results:
+        by_type[result[0]].append(result)
+        by_type["all"].append(result)
+
+    summary = {"requests": len(results), "seconds": round(elapsed, 2),
+               "throughput_rps": round(len(results) / elapsed, 1), "types": {}}
+    print(f"{len(results)} requests in {elapsed:.1f}s: {summary['throughput_rps']} req/s")
+    print(f"{'type':<10} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'fallback':>9}")
+    for request_type in ("all",) + REQUEST_TYPES:
+        rows = by_type.get(request_type)
+        if not rows:
+            continue
+        latencies = sorted(row[1] * 1000 for row in rows)
+        errors = sum(1 for row in rows if row[2] != 200)
+        fallbacks = sum(1 for row in rows if row[3])
+        if request_type in ("all", "template"):
+            fallbacks += keyword_only
+        entry = {
+            "count": len(rows),
+            "p50_ms": round(percentile(latencies, 0.5), 1),
+            "p90_ms": round(percentile(latencies, 0.9), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(latencies[-1], 1),
+            "errors": errors,
+            "fallback_rate": round(fallbacks / len(rows), 4)
+        }
+        summary["types"][request_type] = entry
+        print(f"{request_type:<10} {entry['count']:>7} {entry['p50_ms']:>8} {entry['p90_ms']:>8} {entry['p99_ms']:>8} "
+              f"{entry['max_ms']:>8} {errors:>7} {entry['fallback_rate']:>9.2%}")
+    if upstream_stats is not None:
+        summary["mock_inference"] = upstream_stats
+        print("mock inference calls:", ", ".join(f"{k}={v}" for k, v in sorted(upstream_stats.items())) or "none")
+    return summary
+
+
+def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="test this running deployment instead of starting the app and the mock")
+    parser.add_argument("--workers", type=int, default=4, help="app workers, as in start_server.sh")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("template=0.6,asset=0.2,filename=0.2"))
+    parser.add_argument("--corpus-size", type=int, default=2000,
+                        help="distinct descriptions per type; smaller means more cache hits")
+    parser.add_argument("--latency", default="1-5", help="mock inference latency in seconds, e.g. 0.2 or 1-5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock inference calls failing")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="mock inference calls per second before 429s")
+    parser.add_argument("--ranker", action="store_true", help="train the local ranker on a corpus log and enable it")
+    parser.add_argument("--port", type=int, default=8811)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    processes = []
+    url = args.url
+    mock_url = None
+    try:
+        if url is None:
+            mock_url = f"http://127.0.0.1:{args.mock_port}"
+            processes.append(subprocess.Popen([
+                sys.executable, os.path.join(ROOT, "benchmarks", "mock_inference.py"), "--port", str(args.mock_port),
+                "--latency", args.latency, "--error-rate", str(args.error_rate), "--rate-limit", str(args.rate_limit),
+                "--seed", str(args.seed)]))
+            # Sum the metrics of all workers, flushed often enough to be current after the run
+            env = dict(os.environ, INFERENCE_API_URL=mock_url + "/", HUGGINGFACE_API_KEY="load-test",
+                       INFERENCE_BACKEND="remote", LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+                       METRICS_DIR=tempfile.mkdtemp(prefix="taggenie-load-test-"), METRICS_FLUSH_INTERVAL="0.5")
+            env.pop("SUGGESTION_CACHE_PATH", None)
+            env.pop("RANKER_TABLES_PATH", None)
+            if args.ranker:
+                # A log drawn with another seed than the traffic, like yesterday's requests
+                log = corpus.template_requests(args.corpus_size * 5, seed=args.seed + 100)
+                tables_path = os.path.join(env["METRICS_DIR"], "ranker_tables.json")
+                with open(tables_path, "w") as f:
+                    json.dump(build_tables((r["description"], r["tags"]) for r in log), f)
+                env["RANKER_TABLES_PATH"] = tables_path
+            processes.append(subprocess.Popen([
+                sys.executable, "-m", "app.serve", "--port", str(args.port), "--workers", str(args.workers),
+                "--log-level", "warning"], cwd=ROOT, env=env))
+            url = f"http://127.0.0.1:{args.port}"
+            wait_until_ready(mock_url + "/stats")
+            wait_until_ready(url + "/readyz")
+
+        traffic = Traffic(args.mix, args.corpus_size, args.seed)
+        print(f"{url}: {args.concurrency} concurrent requests for {args.duration:.0f}s"
+              + (f", mock latency {args.latency}s" if mock_url else ""))
+        metrics_before = httpx.get(url + "/metrics").text
+        results, elapsed, _ = asyncio.run(drive(url, traffic, args.concurrency, args.duration))
+        if mock_url:
+            time.sleep(1.0)  # Let every worker flush its metrics
+        metrics_after = httpx.get(url + "/metrics").text
+        keyword_only = (metric_total(metrics_after, "taggenie_keyword_only_fallbacks_total")
+                        - metric_total(metrics_before, "taggenie_keyword_only_fallbacks_total"))
+        upstream_stats = httpx.get(mock_url + "/stats").json() if mock_url else None
+        summary = report(results, elapsed, keyword_only, upstream_stats)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(summary, f, indent=2)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
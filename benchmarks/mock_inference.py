@@ -0,0 +1,91 @@
+"""Local stand-in for the Hugging Face zero-shot classification endpoint.
+
+    python benchmarks/mock_inference.py --port 8900 --latency 1-5 --error-rate 0.02 --rate-limit 50
+
+Answers POST / with the API's response shape: the candidate labels sorted by
+a deterministic pseudo score. Each call sleeps for a latency drawn uniformly
+from --latency (seconds, "0.2" or "1-5"), fails with 503 at --error-rate, and
+gets 429 with Retry-After once more than --rate-limit calls per second arrive
+(a token bucket; 0 disables it). GET /stats returns call counts by outcome.
+Point the app at it with INFERENCE_API_URL=http://127.0.0.1:8900/.
+"""
+import argparse
+import asyncio
+import random
+import time
+import zlib
+from collections import Counter
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def parse_latency(text: str):
+    low, _, high = text.partition("-")
+    return float(low), float(high or low)
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def score(description: str, label: str) -> float:
+    return zlib.crc32(f"{description}\0{label}".encode()) / 0xFFFFFFFF
+
+
+def create_app(latency=(0.0, 0.0), error_rate: float = 0.0, rate_limit: float = 0.0, seed: int = 0) -> Starlette:
+    rng = random.Random(seed)
+    bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+    calls = Counter()
+
+    async def classify(request: Request):
+        payload = await request.json()
+        if bucket is not None and not bucket.take():
+            calls["rate_limited"] += 1
+            return JSONResponse({"error": "Rate limit reached"}, status_code=429, headers={"Retry-After": "1"})
+        await asyncio.sleep(rng.uniform(*latency))
+        if rng.random() < error_rate:
+            calls["error"] += 1
+            return JSONResponse({"error": "Model is currently loading"}, status_code=503)
+        calls["ok"] += 1
+        description = payload["inputs"]
+        labels = sorted(payload["parameters"]["candidate_labels"], key=lambda label: -score(description, label))
+        return JSONResponse({"sequence": description, "labels": labels,
+                             "scores": [round(score(description, label), 4) for label in labels]})
+
+    async def stats(request: Request):
+        return JSONResponse(dict(calls))
+
+    return Starlette(routes=[Route("/", classify, methods=["POST"]), Route("/stats", stats)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="0.2", help='seconds per call: "0.2" or a uniform range "1-5"')
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="calls per second before 429s (0: none)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    app = create_app(parse_latency(args.latency), args.error_rate, args.rate_limit, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
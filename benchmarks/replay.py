@@ -0,0 +1,446 @@
+"""Replay captured traffic and diff suggestions and timings between versions.
+
+Run from the repository root:
+
+    python benchmarks/replay.py requests.jsonl --baseline-ref HEAD~1
+    python benchmarks/replay.py requests.jsonl --save before.jsonl
+    python benchmarks/replay.py requests.jsonl --compare before.jsonl [--fail-on-diff]
+
+Streams a request log (JSONL objects with "description", "type" and
+"filename", as accepted by /api/suggest_tags) and runs every request through
+the suggester the API would dispatch it to, on a process pool. The inference
+API is replaced by a deterministic stub and the suggestion caches are
+disabled, so two versions see identical model scores and every request runs
+the full path. Each request is timed, then run once more under tracemalloc
+for its peak allocation.
+
+--save writes one JSON line per request. --compare replays against such a
+file, and --baseline-ref first replays the log with another git revision
+(checked out in a temporary worktree). Both print every request whose
+suggestions changed, then latency and allocation per request type, before
+and after. Settings that change suggestions (RANKER_TABLES_PATH, ...) are
+read from the environment, so keep it the same for both runs.
+
+Older revisions are replayed through the same stub: those that still call
+the API synchronously with requests.post, keep the cache in a plain dict
+and parse filenames in tag_suggester.py are supported back to the first
+commit. A checkout without a recognizable suggester exits with an error.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, zip_longest
+from typing import Dict, Iterator, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_TYPES = ("template", "asset", "filename")
+
+# Suggestion functions of the replayed version, loaded by load_suggesters()
+_suggesters = {}
+_loop = None
+_measure_allocations = True
+
+
+def stub_scores(description: str, labels) -> List[float]:
+    return [(zlib.crc32(f"{description}|{label}".encode()) % 1000) / 1000 for label in labels]
+
+
+class StubInference:
+    """Deterministic stand-in for the Hugging Face API: no network, fixed scores."""
+
+    async def classify(self, description, labels):
+        return list(labels), stub_scores(description, labels)
+
+    def stats(self):
+        return {"backend": "replay"}
+
+    async def aclose(self):
+        pass
+
+
+class _StubResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, payload: Dict):
+        self._payload = payload
+
+    def json(self) -> Dict:
+        return self._payload
+
+
+class StubRequests:
+    """The same stub for revisions that called the API with requests.post."""
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        labels = json["parameters"]["candidate_labels"]
+        return _StubResponse({"labels": list(labels), "scores": stub_scores(json["inputs"], labels)})
+
+
+class NoCache:
+    """Never holds anything, as a TTLCache (get/set) or as the dict older revisions used."""
+
+    def get(self, key, default=None):
+        return default
+
+    async def aget(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def __contains__(self, key):
+        return False
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def clear(self):
+        pass
+
+
+def load_suggesters(root: str) -> None:
+    """Import the suggesters of the checkout at root, with the stub and without caches."""
+    sys.path.insert(0, root)
+    os.chdir(os.path.join(root, "app"))
+    os.environ.setdefault("HUGGINGFACE_API_KEY", "replay")
+    os.environ["INFERENCE_BACKEND"] = "remote"
+    os.environ.pop("SUGGESTION_CACHE_PATH", None)
+
+    revision = git_revision(root) or root
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            from app import tag_suggester
+            from app.asset_tags_suggester import suggest_asset_tags
+            try:
+                from app.filename_parser import suggest_tags_from_filename
+            except ImportError:
+                # Filenames were parsed in tag_suggester.py before app/filename_parser.py
+                suggest_tags_from_filename = tag_suggester.suggest_tags_from_filename
+    except (ImportError, AttributeError) as e:
+        sys.exit(f"Cannot replay revision {revision}: its suggesters could not be loaded ({e})")
+
+    if hasattr(tag_suggester, "inference_client"):
+        tag_suggester.inference_client = StubInference()
+    elif hasattr(tag_suggester, "requests"):
+        tag_suggester.requests = StubRequests()
+    else:
+        sys.exit(f"Cannot replay revision {revision}: no inference call to replace with the stub")
+    tag_suggester.api_cache = NoCache()
+    if hasattr(tag_suggester, "shared_cache"):
+        tag_suggester.shared_cache = None
+    _suggesters.update(template=tag_suggester.suggest_tags, asset=suggest_asset_tags,
+                       filename=suggest_tags_from_filename)
+
+
+def request_type_of(request: Dict) -> str:
+    """Which suggester the API dispatches a request to, as in app/main.py."""
+    if request.get("filename"):
+        return "filename"
+    return request.get("type") or "template"
+
+
+def iter_requests(path: str) -> Iterator[Dict]:
+    """Requests of a JSONL log, one line at a time; lines that are not requests are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and (record.get("description") or record.get("filename")):
+                yield {"description": record.get("description") or "", "type": record.get("type") or "template",
+                       "filename": record.get("filename") or ""}
+
+
+def _run(request: Dict):
+    request_type = request_type_of(request)
+    if request_type == "filename":
+        return _suggesters["filename"](request["filename"])
+    if request_type == "template":
+        result = _suggesters["template"](request["description"])
+        # suggest_tags was synchronous before the pooled async client
+        return _loop.run_until_complete(result) if asyncio.iscoroutine(result) else result
+    if request_type == "asset":
+        return _suggesters["asset"](request["description"])
+    return {"error": "Invalid type. Must be either 'template' or 'asset'"}
+
+
+def _normalize(result):
+    # Tuples become lists and confidences drop float noise, so saved and live results compare equal
+    if isinstance(result, dict):
+        return {key: _normalize(value) for key, value in result.items()}
+    if isinstance(result, (list, tuple)):
+        return [_normalize(value) for value in result]
+    if isinstance(result, float):
+        return round(result, 6)
+    return result
+
+
+def replay_request(request: Dict) -> Dict:
+    start = time.perf_counter()
+    try:
+        result = _run(request)
+    except Exception as e:
+        result = {"exception": type(e).__name__, "message": str(e)}
+    seconds = time.perf_counter() - start
+
+    allocated = None
+    if _measure_allocations:
+        tracemalloc.start()
+        try:
+            _run(request)
+        except Exception:
+            pass
+        allocated = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"request": request, "type": request_type_of(request), "result": _normalize(result),
+            "seconds": seconds, "peak_alloc_bytes": allocated}
+
+
+def replay_chunk(requests: List[Dict]) -> List[Dict]:
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        return [replay_request(request) for request in requests]
+
+
+def replay(path: str, workers: int, chunk_size: int, limit: Optional[int] = None) -> Iterator[Dict]:
+    """Replay records in log order; workers are forked once the suggesters are loaded."""
+    global _loop
+    requests = islice(iter_requests(path), limit)
+    # Build lazily initialized structures once, before forking
+    replay_chunk([{"description": "warm up", "type": "template", "filename": ""},
+                  {"description": "warm up", "type": "asset", "filename": ""},
+                  {"description": "", "type": "template", "filename": "FY24_Q1_ENG_QASHQAI_PRINT_V1.pdf"}])
+    _loop.close()
+    _loop = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A bounded window of chunks in flight, collected in submit order
+        in_flight = deque()
+        while chunk := list(islice(requests, chunk_size)):
+            in_flight.append(pool.submit(replay_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def git_revision(root: str) -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def iter_saved(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        print(f"Baseline: revision {header.get('revision')}, Python {header.get('python')}")
+        for line in f:
+            yield json.loads(line)
+
+
+def _show(value) -> str:
+    # Every-option suggestions list dozens of tags; their count is enough
+    if isinstance(value, list) and len(value) > 6:
+        return f"[{len(value)} tags]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def diff_results(before, after) -> List[str]:
+    """Readable differences between two suggestion responses, per category."""
+    if not isinstance(before, dict) or not isinstance(after, dict) or \
+            not isinstance(before.get("suggestions"), list) or not isinstance(after.get("suggestions"), list):
+        return [f"{json.dumps(before, ensure_ascii=False)} -> {json.dumps(after, ensure_ascii=False)}"]
+    lines = []
+    for key in sorted((set(before) | set(after)) - {"suggestions"}):
+        if before.get(key) != after.get(key):
+            lines.append(f"{key}: {json.dumps(before.get(key), ensure_ascii=False)} -> "
+                         f"{json.dumps(after.get(key), ensure_ascii=False)}")
+    old = {suggestion.get("category"): suggestion for suggestion in before["suggestions"]}
+    new = {suggestion.get("category"): suggestion for suggestion in after["suggestions"]}
+    for category in list(old) + [category for category in new if category not in old]:
+        a, b = old.get(category), new.get(category)
+        if a == b:
+            continue
+        if a is None or b is None:
+            lines.append(f"{category}: {'added' if a is None else 'removed'} {(b or a).get('suggested_tags')}")
+            continue
+        for field in sorted(set(a) | set(b)):
+            if a.get(field) != b.get(field):
+                lines.append(f"{category} {field}: {_show(a.get(field))} -> {_show(b.get(field))}")
+    if not lines:
+        lines.append("category order changed")
+    return lines
+
+
+def percentile(ordered, q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def summarize(records: List[Dict], key: str) -> Dict:
+    latencies = sorted(record[key]["seconds"] * 1e6 for record in records)
+    allocations = [record[key]["peak_alloc_bytes"] for record in records if record[key]["peak_alloc_bytes"] is not None]
+    return {
+        "p50_us": percentile(latencies, 0.5),
+        "p90_us": percentile(latencies, 0.9),
+        "p99_us": percentile(latencies, 0.99),
+        "mean_us": sum(latencies) / len(latencies),
+        "alloc_bytes": sum(allocations) / len(allocations) if allocations else None
+    }
+
+
+def report_timings(pairs: Dict[str, List[Dict]]) -> None:
+    print(f"\n{'type':<10} {'count':>7} {'p50 before':>11} {'p50 now':>9} {'delta':>8} "
+          f"{'p99 before':>11} {'p99 now':>9} {'mean delta':>11} {'alloc delta':>12}")
+    for request_type in ("all",) + REQUEST_TYPES:
+        records = pairs.get(request_type)
+        if not records:
+            continue
+        before, after = summarize(records, "before"), summarize(records, "after")
+        delta = after["p50_us"] / before["p50_us"] - 1 if before["p50_us"] else 0.0
+        mean_delta = after["mean_us"] / before["mean_us"] - 1 if before["mean_us"] else 0.0
+        alloc = "-" if before["alloc_bytes"] is None or after["alloc_bytes"] is None else \
+            f"{after['alloc_bytes'] - before['alloc_bytes']:+.0f}B"
+        print(f"{request_type:<10} {len(records):>7} {before['p50_us']:>11.1f} {after['p50_us']:>9.1f} {delta:>+8.1%} "
+              f"{before['p99_us']:>11.1f} {after['p99_us']:>9.1f} {mean_delta:>+11.1%} {alloc:>12}")
+
+
+def compare(current: Iterator[Dict], baseline: Iterator[Dict], show: int, diff_output: Optional[str]) -> int:
+    """Print changed suggestions and timing deltas; returns the number of changed requests."""
+    pairs = defaultdict(list)
+    changed = compared = 0
+    out = open(diff_output, "w", encoding="utf-8") if diff_output else None
+    try:
+        for n, (after, before) in enumerate(zip_longest(current, baseline)):
+            if after is None or before is None:
+                print(f"Warning: the baseline has {'more' if after is None else 'fewer'} requests than this replay; "
+                      "replay the same log with the same --limit")
+                break
+            if before["request"] != after["request"]:
+                sys.exit(f"Request {n} differs from the baseline's; replay the same log")
+            compared += 1
+            pair = {"before": before, "after": after}
+            pairs[after["type"]].append(pair)
+            pairs["all"].append(pair)
+            if before["result"] == after["result"]:
+                continue
+            changed += 1
+            lines = diff_results(before["result"], after["result"])
+            if changed <= show:
+                print(f"#{n} {after['type']}: {after['request']['filename'] or after['request']['description']}")
+                for line in lines:
+                    print(f"    {line}")
+            if out:
+                out.write(json.dumps({"index": n, "request": after["request"], "before": before["result"],
+                                      "after": after["result"], "diff": lines}, ensure_ascii=False) + "\n")
+    finally:
+        if out:
+            out.close()
+    if changed > show:
+        print(f"... and {changed - show} more")
+    print(f"\n{changed} of {compared} requests changed their suggestions")
+    report_timings(pairs)
+    return changed
+
+
+def save(records: Iterator[Dict], path: str, root: str) -> Iterator[Dict]:
+    """Write records to path as they pass through."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"revision": git_revision(root), "python": platform.python_version()}) + "\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            yield record
+
+
+def replay_revision(ref: str, args, output: str) -> None:
+    """Replay the log with another revision, checked out in a temporary worktree."""
+    worktree = tempfile.mkdtemp(prefix="taggenie-replay-")
+    try:
+        subprocess.run(["git", "worktree", "add", "--detach", "--quiet", worktree, ref], cwd=ROOT, check=True)
+        command = [sys.executable, os.path.abspath(__file__), os.path.abspath(args.log), "--root", worktree,
+                   "--save", output, "--workers", str(args.workers), "--chunk-size", str(args.chunk_size)]
+        if args.limit is not None:
+            command += ["--limit", str(args.limit)]
+        if args.no_alloc:
+            command.append("--no-alloc")
+        print(f"Replaying {args.log} with {ref}")
+        if subprocess.run(command).returncode:
+            sys.exit(f"Replaying with {ref} failed")
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT, check=False)
+        shutil.rmtree(worktree, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a request log and diff suggestions between versions.")
+    parser.add_argument("log", help="JSONL request log")
+    parser.add_argument("--save", help="write every replayed request, result and timing to this JSONL file")
+    parser.add_argument("--compare", help="diff against a file written by --save")
+    parser.add_argument("--baseline-ref", help="replay with this git revision first, then diff against it")
+    parser.add_argument("--root", default=ROOT, help="checkout whose app to replay (default: this one)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="replay processes")
+    parser.add_argument("--chunk-size", type=int, default=200, help="requests per work unit")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the traced second run of each request")
+    parser.add_argument("--show", type=int, default=20, help="print at most this many changed requests")
+    parser.add_argument("--diff-output", help="write every changed request to this JSONL file")
+    parser.add_argument("--fail-on-diff", action="store_true", help="exit 1 if any suggestion changed")
+    args = parser.parse_args(argv)
+
+    baseline_path = args.compare
+    scratch = None
+    if args.baseline_ref:
+        scratch = tempfile.NamedTemporaryFile(prefix="taggenie-replay-", suffix=".jsonl", delete=False).name
+        replay_revision(args.baseline_ref, args, scratch)
+        baseline_path = scratch
+
+    global _measure_allocations
+    _measure_allocations = not args.no_alloc
+    # Loading the suggesters changes the working directory
+    log = os.path.abspath(args.log)
+    baseline_path = baseline_path and os.path.abspath(baseline_path)
+    diff_output = args.diff_output and os.path.abspath(args.diff_output)
+    save_path = args.save and os.path.abspath(args.save)
+    load_suggesters(os.path.abspath(args.root))
+    records = replay(log, args.workers, args.chunk_size, args.limit)
+    if save_path:
+        records = save(records, save_path, args.root)
+
+    try:
+        if baseline_path:
+            changed = compare(records, iter_saved(baseline_path), args.show, diff_output)
+            if changed and args.fail_on_diff:
+                sys.exit(1)
+        else:
+            count = sum(1 for _ in records)
+            print(f"Replayed {count} requests" + (f" into {args.save}" if args.save else ""))
+    finally:
+        if scratch:
+            os.unlink(scratch)
+
+
+if __name__ == "__main__":
+    main()
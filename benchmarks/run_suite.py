@@ -0,0 +1,204 @@
+"""Micro-benchmark suite for the suggestion hot paths.
+
+Run from the repository root:
+
+    python benchmarks/run_suite.py                       # print results
+    python benchmarks/run_suite.py --save results.json   # save for later comparison
+    python benchmarks/run_suite.py --compare results.json [--fail-on-regression]
+
+Benchmarks suggest_tags, get_relevant_asset_tags, parse_filename and
+suggest_tags_from_filename over a generated corpus in all nine languages. The
+Hugging Face API is replaced by a deterministic local stub and the zero-shot
+cache is disabled, so every suggest_tags call runs the full path. For each
+function the suite reports the latency distribution and the average peak
+allocation per call; --compare prints the change against a saved run.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(os.path.join(ROOT, "app"))
+os.environ.setdefault("HUGGINGFACE_API_KEY", "benchmark")
+os.environ["INFERENCE_BACKEND"] = "remote"
+
+with contextlib.redirect_stdout(open(os.devnull, "w")):
+    from app import tag_suggester  # noqa: E402
+from app.asset_tags_suggester import get_relevant_asset_tags  # noqa: E402
+from app.filename_parser import parse_filename, suggest_tags_from_filename  # noqa: E402
+from app.suggestion_cache import TTLCache  # noqa: E402
+from benchmarks import corpus  # noqa: E402
+
+CORPUS_SIZE = 900
+ALLOCATION_SAMPLES = 200
+
+
+class StubInference:
+    """Deterministic stand-in for the Hugging Face API: no network, fixed scores."""
+
+    async def classify(self, description, labels):
+        scores = [(zlib.crc32(f"{description}|{label}".encode()) % 1000) / 1000 for label in labels]
+        return list(labels), scores
+
+    async def aclose(self):
+        pass
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    n = len(samples)
+
+    def pct(p):
+        return samples[min(n - 1, int(n * p / 100))] * 1e6
+
+    return {
+        "calls": n,
+        "mean_us": sum(samples) / n * 1e6,
+        "min_us": samples[0] * 1e6,
+        "p50_us": pct(50),
+        "p90_us": pct(90),
+        "p99_us": pct(99),
+        "max_us": samples[-1] * 1e6,
+    }
+
+
+def measure_sync(func, inputs, rounds):
+    timings = []
+    for _ in range(rounds):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def measure_async(func, inputs, rounds):
+    timings = []
+    for _ in range(rounds):
+        for item in inputs:
+            start = time.perf_counter()
+            await func(item)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_allocation(call, inputs):
+    """Average peak traced memory of a single call, in bytes."""
+    peaks = []
+    tracemalloc.start()
+    for item in inputs[:ALLOCATION_SAMPLES]:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call(item)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rounds):
+    tag_suggester.inference_client = StubInference()
+    # Measure the full path, also when SUGGESTION_CACHE_PATH is set
+    tag_suggester.api_cache = TTLCache(maxsize=0)
+    tag_suggester.shared_cache = None
+
+    templates = corpus.template_descriptions(CORPUS_SIZE)
+    assets = corpus.asset_descriptions(CORPUS_SIZE)
+    names = corpus.filenames(CORPUS_SIZE)
+
+    loop = asyncio.new_event_loop()
+    results = {}
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        # Warm up lazily built structures before measuring
+        for description in templates[:20]:
+            loop.run_until_complete(tag_suggester.suggest_tags(description))
+
+        timings = loop.run_until_complete(measure_async(tag_suggester.suggest_tags, templates, rounds))
+        results["suggest_tags"] = summarize(timings)
+        results["suggest_tags"]["peak_alloc_bytes"] = peak_allocation(
+            lambda d: loop.run_until_complete(tag_suggester.suggest_tags(d)), templates)
+
+    for name, func, inputs in [
+        ("get_relevant_asset_tags", get_relevant_asset_tags, assets),
+        ("parse_filename", parse_filename, names),
+        ("suggest_tags_from_filename", suggest_tags_from_filename, names),
+    ]:
+        func(inputs[0])
+        results[name] = summarize(measure_sync(func, inputs, rounds))
+        results[name]["peak_alloc_bytes"] = peak_allocation(func, inputs)
+    loop.close()
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Print per-function deltas; return the names that regressed beyond threshold."""
+    regressions = []
+    print(f"\n{'function':<28} {'p50 before':>11} {'p50 now':>9} {'delta':>8} {'alloc delta':>12}")
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            print(f"{name:<28} {'-':>11} {now['p50_us']:>9.1f}")
+            continue
+        delta = now["p50_us"] / before["p50_us"] - 1
+        alloc_delta = now["peak_alloc_bytes"] - before["peak_alloc_bytes"]
+        flag = "  REGRESSION" if delta > threshold else ""
+        print(f"{name:<28} {before['p50_us']:>11.1f} {now['p50_us']:>9.1f} {delta:>+8.1%} {alloc_delta:>+11.0f}B{flag}")
+        if delta > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the suggestion hot paths.")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the corpus per function")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a saved JSON result file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if anything regressed")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus_size": CORPUS_SIZE,
+        "rounds": args.rounds,
+        "results": run(args.rounds),
+    }
+
+    print(f"{'function':<28} {'p50 us':>8} {'p90 us':>8} {'p99 us':>8} {'mean us':>8} {'peak alloc':>11}")
+    for name, stats in report["results"].items():
+        print(f"{name:<28} {stats['p50_us']:>8.1f} {stats['p90_us']:>8.1f} {stats['p99_us']:>8.1f} "
+              f"{stats['mean_us']:>8.1f} {stats['peak_alloc_bytes']:>10.0f}B")
+
+    if args.save:
+        with open(os.path.join(ROOT, args.save) if not os.path.isabs(args.save) else args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        path = os.path.join(ROOT, args.compare) if not os.path.isabs(args.compare) else args.compare
+        with open(path) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
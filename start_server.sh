@@ -8,7 +8,7 @@ check_port() {
 
 # Kill any existing uvicorn processes
 echo "Killing any existing uvicorn processes..."
-pkill -9 -f uvicorn
+pkill -9 -f "uvicorn|app.serve"
 
 # Wait a moment to ensure the port is freed
 sleep 2
@@ -25,8 +25,8 @@ fi
 
 # Start the backend server
 echo "Starting backend server..."
-cd app
-nohup uvicorn main:app --host 0.0.0.0 --port 8001 --workers 4 > ../backend.log 2>&1 &
+# Loads the app once and forks the workers, which share it copy-on-write
+nohup python -m app.serve --host 0.0.0.0 --port 8001 --workers 4 > backend.log 2>&1 &
 BACKEND_PID=$!
 
 # Wait a moment for the backend to start
@@ -34,7 +34,7 @@ sleep 2
 
 # Start the frontend server
 echo "Starting frontend server..."
-cd ../frontend
+cd frontend
 
 # Check if we're in production mode
 if [ "$NODE_ENV" = "production" ]; then
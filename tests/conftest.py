@@ -0,0 +1,4 @@
+import os
+
+# Import the app without a Hugging Face key; tests stub the upstream calls they need
+os.environ.setdefault("INFERENCE_BACKEND", "local")
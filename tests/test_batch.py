@@ -0,0 +1,79 @@
+import asyncio
+
+import orjson
+from starlette.testclient import TestClient
+
+from app.batch import run_batch
+from app.main import app
+
+
+async def collect(items, delays, ordered, concurrency=8):
+    async def handler(item):
+        await asyncio.sleep(delays[item])
+        return {"item": item}
+    return [(index, result["item"]) async for index, result in run_batch(items, handler, concurrency, ordered)]
+
+
+def test_results_come_back_in_input_order():
+    delays = {"a": 0.03, "b": 0.0, "c": 0.01}
+    assert asyncio.run(collect(["a", "b", "c"], delays, ordered=True)) == [(0, "a"), (1, "b"), (2, "c")]
+
+
+def test_completion_order_keeps_input_indexes():
+    delays = {"a": 0.03, "b": 0.0, "c": 0.01}
+    assert asyncio.run(collect(["a", "b", "c"], delays, ordered=False)) == [(1, "b"), (2, "c"), (0, "a")]
+
+
+def test_concurrency_bounds_calls_in_flight():
+    in_flight = peak = 0
+
+    async def handler(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return {}
+
+    async def run():
+        return [index async for index, _ in run_batch(range(20), handler, concurrency=3)]
+
+    assert asyncio.run(run()) == list(range(20))
+    assert peak == 3
+
+
+def lines(response):
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_batch_endpoint_reports_errors_per_item():
+    items = [
+        {"filename": "FY24_Q1_ENG_QASHQAI_PRINT_V1.pdf"},
+        {"description": "dealer logo", "type": "unknown"},
+        {"description": ["not", "a", "string"]},
+        {"description": "baseplate for Juke", "type": "asset"},
+    ]
+    with TestClient(app) as client:
+        response = client.post("/api/suggest_tags/batch", json=items)
+    assert response.status_code == 200
+    results = lines(response)
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert "result" in results[0] and "result" in results[3]
+    assert results[1]["error"]["status"] == 400
+    assert results[2]["error"]["status"] == 422
+
+
+def test_batch_endpoint_reads_ndjson_with_invalid_lines():
+    body = b'{"filename": "FY24_Q1_FIN_JUKE_BANNER_300x250_V1.html"}\nnot json\n{"description": "packshot", "type": "asset"}'
+    with TestClient(app) as client:
+        response = client.post("/api/suggest_tags/batch", content=body,
+                               headers={"content-type": "application/x-ndjson"})
+    results = lines(response)
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[1]["error"]["status"] == 400
+    assert "result" in results[0] and "result" in results[2]
+
+
+def test_batch_endpoint_rejects_a_body_that_is_not_a_list():
+    with TestClient(app) as client:
+        assert client.post("/api/suggest_tags/batch", json={"description": "x"}).status_code == 400
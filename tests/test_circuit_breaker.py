@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from app import tag_suggester
+from app.resilience import CircuitBreaker
+from app.suggestion_cache import TTLCache
+
+
+class HangingInference:
+    def __init__(self):
+        self.calls = 0
+
+    async def classify(self, description, labels):
+        self.calls += 1
+        await asyncio.Event().wait()
+
+
+def test_hanging_upstream_opens_the_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    upstream = HangingInference()
+    monkeypatch.setattr(tag_suggester, "circuit_breaker", breaker)
+    monkeypatch.setattr(tag_suggester, "inference_client", upstream)
+    monkeypatch.setattr(tag_suggester, "api_cache", TTLCache(maxsize=0))
+    monkeypatch.setattr(tag_suggester, "ranker", None)
+
+    async def requests():
+        results = []
+        for i in range(4):
+            description = f"Qashqai print ad {i}"
+            matches = tag_suggester.TEMPLATE_MATCHER.scan(description)
+            results.append(await tag_suggester.model_scores(description, matches, time.monotonic() + 0.05))
+        return results
+
+    assert asyncio.run(requests()) == [None] * 4
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    # Once open, the hanging upstream is no longer called
+    assert upstream.calls == 2
+    assert breaker.rejected == 2
+
+
+def test_cancellation_before_the_deadline_is_no_failure():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    async def disconnect():
+        call = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10), time.monotonic() + 10))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+
+    asyncio.run(disconnect())
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
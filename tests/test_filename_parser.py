@@ -0,0 +1,27 @@
+import pytest
+
+from app.filename_parser import parse_filename
+
+
+def vehicles(token):
+    return parse_filename(f"FY24_Q1_ENG_{token}_PRINT_V1.pdf")['vehicles']
+
+
+@pytest.mark.parametrize("token", ["NV300", "NT400", "NV200", "X-TRAIL", "XTRAIL", "GT-R", "GTR", "qashqai"])
+def test_known_vehicles_are_kept_as_written(token):
+    assert vehicles(token) == [token]
+
+
+@pytest.mark.parametrize("token", ["JUKES", "LEAFS", "NV500"])
+def test_short_or_ambiguous_tokens_are_not_corrected(token):
+    assert vehicles(token) == [token]
+
+
+@pytest.mark.parametrize("token, corrected", [
+    ("QASHQAL", "QASHQAI"),
+    ("XTRIAL", "XTRAIL"),
+    ("NAVRA", "NAVARA"),
+    ("INTERSTAR2O24", "INTERSTAR2024"),
+])
+def test_misspelled_vehicles_are_corrected(token, corrected):
+    assert vehicles(token) == [corrected]
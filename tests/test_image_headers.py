@@ -0,0 +1,84 @@
+import struct
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.asset_tags_suggester import suggest_upload_tags
+from app.image_headers import HeaderSniffer, ImageInfo, sniff
+from app.main import app
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", 600, 500) + b"\x08\x06\x00\x00\x00" + b"\0" * 100
+GIF = b"GIF89a" + struct.pack("<HH", 300, 250) + b"\0" * 20
+# APP1 (EXIF) and an unknown APP segment come before the frame header
+JPEG = (b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", 5002) + b"\0" * 5000 + b"\xff\xee\x00\x04ab"
+        + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 250, 300) + b"\0" * 12)
+
+
+def feed_in_chunks(data, size):
+    sniffer = HeaderSniffer()
+    for i in range(0, len(data), size):
+        if sniffer.feed(data[i:i + size]):
+            break
+    return sniffer.close()
+
+
+@pytest.mark.parametrize("data, expected", [
+    (PNG, ImageInfo("png", 600, 500)),
+    (GIF, ImageInfo("gif", 300, 250)),
+    (JPEG, ImageInfo("jpeg", 300, 250)),
+    (b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="300px" height="250">',
+     ImageInfo("svg", 300, 250)),
+    (b'<svg width="100%" viewBox="0, 0, 728 90">', ImageInfo("svg", 728, 90)),
+    (b"%PDF-1.7\n1 0 obj << /Type /Page /MediaBox [0 0 595.28 841.89] >>", ImageInfo("pdf", 595, 842, "pt")),
+])
+def test_sniffs_format_and_dimensions(data, expected):
+    assert sniff(data) == expected
+    # The same answer when the header arrives a few bytes at a time
+    assert feed_in_chunks(data, 7) == expected
+
+
+def test_skipped_jpeg_segments_are_not_buffered():
+    sniffer = HeaderSniffer(limit=1024)
+    for i in range(0, len(JPEG), 512):
+        if sniffer.feed(JPEG[i:i + 512]):
+            break
+    assert sniffer.close() == ImageInfo("jpeg", 300, 250)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b'<svg width="." height="250">', ImageInfo("svg", None, 250)),
+    (b'<svg width="' + b"9" * 400 + b'" height="1e3">', ImageInfo("svg", None, None)),
+    (b'<svg width="1.2.3" viewBox="0 0 inf nan">', ImageInfo("svg", None, None)),
+    (b"%PDF-1.4 /MediaBox [0 0 . 842]", ImageInfo("pdf", None, None, "pt")),
+    (b"%PDF-1.4 /MediaBox [0 0 " + b"9" * 400 + b" 842]", ImageInfo("pdf", None, 842, "pt")),
+    (b"\x89PNG\r\n\x1a\n" + b"\0" * 16, ImageInfo("png", None, None)),
+    (b"\xff\xd8\x00\x00\x00\x00", ImageInfo("jpeg", None, None)),
+], ids=["svg-dot", "svg-huge", "svg-bad-viewbox", "pdf-dot", "pdf-huge", "png-no-ihdr", "jpeg-no-marker"])
+def test_malformed_headers_report_the_format_without_dimensions(data, expected):
+    assert sniff(data) == expected
+
+
+def test_unknown_files_and_plain_markup_have_no_info():
+    assert sniff(b"just some text") is None
+    assert sniff(b"<html><body></body></html>") is None
+    assert sniff(b"") is None
+
+
+def test_format_type_only_when_the_description_names_none():
+    suggestions = suggest_upload_tags(sniff(GIF))["suggestions"]
+    assert {"category": "type", "suggested_tags": ["type/image"], "confidence": 0.95} in suggestions
+    assert {"category": "system/size", "suggested_tags": ["system/size/300x250px"], "confidence": 1.0} in suggestions
+    types = [s["suggested_tags"] for s in suggest_upload_tags(sniff(PNG), "Dealer logo")["suggestions"]
+             if s["category"] == "type"]
+    assert types == [["type/dealer-logo"]]
+    pdf = suggest_upload_tags(sniff(b"%PDF-1.4 /MediaBox [0 0 595 842]"))["suggestions"]
+    assert not any(s["category"] == "type" for s in pdf)
+
+
+def test_upload_with_malformed_sizes_succeeds():
+    with TestClient(app) as client:
+        response = client.post("/api/suggest_tags/upload", params={"filename": "logo.svg"},
+                               content=b'<svg width="." height="' + b"9" * 400 + b'">')
+    assert response.status_code == 200
+    result = response.json()["files"][0]
+    assert (result["format"], result["width"], result["height"]) == ("svg", None, None)
@@ -0,0 +1,55 @@
+import time
+
+from app.keyword_matcher import KeywordMatcher, tokenize
+
+
+def matcher():
+    return KeywordMatcher().add_group("language", {
+        "finnish": ["finnish", "fi"],
+        "norwegian": ["norwegian", "no"],
+        "estonian": ["estonian", "et"],
+    }).add_group("type", {
+        "baseplate": ["baseplate", "base plate"],
+        "dealer-logo": ["dealer logo"],
+    }).add_group("vehicle", {
+        "x-trail": ["x-trail", "xt"],
+        "qashqai": ["qashqai"],
+    }).compile()
+
+
+def test_tokenize_splits_on_whitespace_and_punctuation():
+    assert tokenize("X-Trail, A4 «Print»") == ["x", "trail", "a4", "print"]
+
+
+def test_short_codes_match_whole_tokens_only():
+    matches = matcher().scan("Office note for the next campaign")
+    assert "language" not in matches
+    assert "vehicle" not in matches
+    assert matcher().scan("Banner FI, NO").labels("language") == ["finnish", "norwegian"]
+
+
+def test_multi_word_keywords_match_consecutive_tokens():
+    assert matcher().scan("Base plate for dealers").first("type") == "baseplate"
+    assert matcher().scan("A plate with a base").first("type") is None
+    assert matcher().scan("Dealer-logo, print").first("type") == "dealer-logo"
+    assert matcher().scan("Logo of the dealer").first("type") is None
+
+
+def test_hyphenated_keywords_and_glued_digits():
+    assert matcher().scan("New X-Trail banner").first("vehicle") == "x-trail"
+    assert matcher().scan("QASHQAI2024 print").first("vehicle") == "qashqai"
+
+
+def test_labels_keep_declaration_order():
+    matches = matcher().scan("et no fi")
+    assert matches.labels("language") == ["finnish", "norwegian", "estonian"]
+    assert matches.first("language") == "finnish"
+    assert matches.has("language", "estonian")
+
+
+def test_fuzzy_groups_match_typos_but_skip_very_long_words():
+    fuzzy = KeywordMatcher().add_group("vehicle", {"qashqai": ["qashqai"]}, fuzzy=True).compile()
+    assert fuzzy.scan("Banner for quashqai").first("vehicle") == "qashqai"
+    start = time.perf_counter()
+    assert fuzzy.scan("Banner " + "q" * 400).first("vehicle") is None
+    assert time.perf_counter() - start < 0.01
@@ -0,0 +1,25 @@
+import gzip
+
+import brotli
+
+from app import precompressed
+from app.precompressed import PrecompressedJSON
+
+PAYLOAD = {"filter": {"subcategories": {"vehicle": ["qashqai", "juke", "x-trail"]}}}
+
+
+def test_brotli_variant_is_built_and_preferred():
+    response = PrecompressedJSON(PAYLOAD)
+    assert set(response.variants) == {"gzip", "br"}
+    assert brotli.decompress(response.variants["br"]) == response.body
+    assert response.pick_encoding("gzip, deflate, br") == "br"
+    assert response.pick_encoding("gzip") == "gzip"
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(precompressed, "brotli", None)
+    response = PrecompressedJSON(PAYLOAD)
+    assert set(response.variants) == {"gzip"}
+    assert gzip.decompress(response.variants["gzip"]) == response.body
+    assert response.pick_encoding("gzip, deflate, br") == "gzip"
+    assert response.pick_encoding("br") is None
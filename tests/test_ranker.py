@@ -0,0 +1,48 @@
+from app import tag_suggester
+from app.ranker import Ranker, build_tables
+
+
+def examples():
+    return ([("Interstar 2024 print for dealers", ["filter/vehicle/interstar2024"])] * 30
+            + [("Qashqai banner", ["filter/vehicle/qashqai", "system/media/html5-banner"])] * 30
+            + [("Generic poster", [])] * 10)
+
+
+def test_build_tables_counts_tokens_and_accepted_vehicles():
+    tables = build_tables(examples(), min_count=5)
+    assert tables["records"] == 70
+    assert tables["labels"] == {"filter/vehicle/interstar2024": 30, "filter/vehicle/qashqai": 30}
+    assert tables["features"]["interstar"] == [30, {"filter/vehicle/interstar2024": 30}]
+    assert tables["features"]["poster"] == [10, {}]
+    # Numbers say nothing about the vehicle, and rare tokens are dropped
+    assert "2024" not in tables["features"]
+    assert "print" in tables["features"]
+    assert "print" not in build_tables(examples(), min_count=31)["features"]
+
+
+def test_rank_answers_confident_descriptions_only():
+    ranker = Ranker(build_tables(examples()), threshold=0.9, min_support=20)
+    label, confidence = ranker.rank("New Interstar 2024 flyer")
+    assert label == "filter/vehicle/interstar2024"
+    assert confidence >= 0.9
+    # Conflicting evidence and unknown words go to the model
+    assert ranker.rank("Interstar and Qashqai banner") is None
+    assert ranker.rank("Generic poster") is None
+    assert (ranker.answered, ranker.ambiguous) == (1, 2)
+
+
+def test_rank_ignores_labels_outside_the_known_ones():
+    ranker = Ranker(build_tables(examples()), labels=["filter/vehicle/qashqai"])
+    assert ranker.rank("Interstar 2024 print") is None
+    assert ranker.rank("Qashqai banner")[0] == "filter/vehicle/qashqai"
+
+
+def test_ranked_vehicle_is_suggested_as_is():
+    matches = tag_suggester.TEMPLATE_MATCHER.scan("Interstar 2024 print")
+    suggestions = tag_suggester.assemble_suggestions(matches, ("filter/vehicle/interstar2024",), (0.95,))
+    assert suggestions[0] == {"category": "filter", "suggested_tags": ["filter/vehicle/interstar2024"],
+                              "confidence": 0.95}
+    # Scores of other categories never become the vehicle filter
+    suggestions = tag_suggester.assemble_suggestions(matches, ("language/finnish",), (0.99,))
+    assert suggestions[0]["category"] == "filter"
+    assert suggestions[0]["suggested_tags"] != ["language/finnish"]
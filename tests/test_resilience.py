@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.resilience import CircuitBreaker, CircuitOpenError, SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch(key):
+        async def call():
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return f"scores for {key}"
+        return call
+
+    async def run():
+        return await asyncio.gather(flights.do("a", fetch("a")), flights.do("a", fetch("a")),
+                                    flights.do("b", fetch("b")))
+
+    assert asyncio.run(run()) == ["scores for a", "scores for a", "scores for b"]
+    assert calls == ["a", "b"]
+    assert flights.stats() == {"calls": 2, "coalesced": 1, "cancelled": 0, "in_flight": 0}
+
+
+def test_shared_call_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(flights.do("a", fail), flights.do("a", fail), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(run())] == [RuntimeError, RuntimeError]
+    assert flights.stats()["calls"] == 1
+
+
+def test_breaker_opens_then_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "scores"
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        clock.now = 30
+        assert await breaker.call(ok) == "scores"
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats() == {"state": "closed", "consecutive_failures": 0, "trips": 1, "rejected": 1}
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        clock.now = 30
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == 30
+
+
+def test_slow_success_counts_as_a_failure():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=3, clock=clock)
+
+    async def slow():
+        clock.now += 5
+        return "late scores"
+
+    assert asyncio.run(breaker.call(slow)) == "late scores"
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_caller_after_a_cancelled_flight_starts_a_new_call():
+    flights = SingleFlight()
+    started = []
+
+    def fetch(n):
+        async def call():
+            started.append(n)
+            await asyncio.sleep(0.01)
+            return f"call {n}"
+        return call
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("a", fetch(1)))
+        await asyncio.sleep(0)
+        first.cancel()
+        # The only waiter is gone; the next caller must not join the dying call
+        await asyncio.sleep(0)
+        second = await flights.do("a", fetch(2))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return second
+
+    assert asyncio.run(run()) == "call 2"
+    assert started == [1, 2]
+    assert flights.stats() == {"calls": 2, "coalesced": 0, "cancelled": 1, "in_flight": 0}
@@ -0,0 +1,30 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app.main import TagSuggestionResponse, app
+
+REQUESTS = [
+    {"description": "Finnish HTML5 banner 300x250 for Qashqai", "type": "template"},
+    {"description": "Swedish price lectern for Juke", "type": "template"},
+    {"description": "Dealer logo in Norwegian", "type": "asset"},
+    {"filename": "FY24_Q1_FIN_QASHQAI_BANNER_300x250_V1.png"},
+]
+
+
+@pytest.mark.parametrize("body", REQUESTS)
+def test_suggestions_match_the_documented_response(body):
+    with TestClient(app) as client:
+        response = client.post("/api/suggest_tags", json=body)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["suggestions"]
+    # The endpoint skips validation, so check the shape here; None fields are never sent
+    validated = TagSuggestionResponse.model_validate(payload)
+    assert validated.model_dump(exclude_none=True) == payload
+
+
+def test_openapi_documents_the_response_model():
+    with TestClient(app) as client:
+        schema = client.get("/openapi.json").json()
+    response = schema["paths"]["/api/suggest_tags"]["post"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/TagSuggestionResponse"}
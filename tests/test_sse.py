@@ -0,0 +1,97 @@
+import asyncio
+
+import orjson
+import pytest
+from starlette.testclient import TestClient
+
+from app import main, tag_suggester
+from app.metrics import CLIENT_DISCONNECTS
+from app.suggestion_cache import TTLCache
+
+STREAM = "/api/suggest_tags/stream"
+
+
+class ConfidentInference:
+    async def classify(self, description, labels):
+        return list(labels), [0.97 if label.startswith("filter/vehicle/") else 0.1 for label in labels]
+
+
+class HangingInference:
+    def __init__(self):
+        self.cancelled = False
+
+    async def classify(self, description, labels):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(tag_suggester, "api_cache", TTLCache(maxsize=0))
+    monkeypatch.setattr(tag_suggester, "ranker", None)
+
+    def use(client):
+        monkeypatch.setattr(tag_suggester, "inference_client", client)
+        return client
+    return use
+
+
+def events(body: bytes):
+    parsed = []
+    for message in body.decode().strip().split("\n\n"):
+        event, data = message.split("\n")
+        parsed.append((event.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+def test_template_streams_suggestions_update_then_final(upstream):
+    upstream(ConfidentInference())
+    body = {"description": "Finnish print ad for Juke", "type": "template"}
+    with TestClient(main.app) as client:
+        response = client.post(STREAM, json=body)
+        expected = client.post("/api/suggest_tags", json=body).json()
+    assert response.headers["content-type"].startswith("text/event-stream")
+    stream = events(response.content)
+    assert [event for event, _ in stream] == ["suggestions", "update", "final"]
+    initial, update, final = (payload["suggestions"] for _, payload in stream)
+    assert update == [{"category": "filter", "suggested_tags": ["filter/vehicle/juke"], "confidence": 0.97}]
+    assert update[0] in final and update[0] not in initial
+    assert stream[-1][1] == expected
+
+
+def test_asset_and_filename_requests_get_a_single_final_event():
+    with TestClient(main.app) as client:
+        asset = events(client.get(STREAM, params={"description": "dealer logo", "type": "asset"}).content)
+        filename = events(client.get(STREAM, params={"filename": "FY24_Q1_FIN_JUKE_PRINT_V1.pdf"}).content)
+    assert [event for event, _ in asset] == ["final"]
+    assert [event for event, _ in filename] == ["final"]
+
+
+def test_invalid_type_is_rejected_before_streaming():
+    with TestClient(main.app) as client:
+        assert client.post(STREAM, json={"description": "x", "type": "video"}).status_code == 400
+
+
+def test_disconnect_cancels_the_pending_model_call(upstream):
+    hanging = upstream(HangingInference())
+    before = CLIENT_DISCONNECTS.snapshot().get((STREAM,), 0)
+    response = main.event_stream(main.TagRequest(description="Finnish print ad for Juke"))
+
+    async def disconnect_after_first_event():
+        stream = response.body_iterator
+        first = await stream.__anext__()
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        # StreamingResponse cancels the stream when the client goes away
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        return first
+
+    first = asyncio.run(disconnect_after_first_event())
+    assert first.startswith(b"event: suggestions\n")
+    assert hanging.cancelled
+    assert CLIENT_DISCONNECTS.snapshot()[(STREAM,)] == before + 1
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+from app.suggestion_cache import SQLiteCache, TieredCache, TTLCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("key", "value")
+    clock.now = 59.9
+    assert cache.get("key") == "value"
+    clock.now = 60.0
+    assert cache.get("key") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # b is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_setting_an_existing_key_refreshes_it():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now = 30
+    cache.set("a", 10)
+    cache.set("c", 3)
+    clock.now = 70
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = TTLCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_cache_key_ignores_case_whitespace_and_label_order():
+    assert make_cache_key("  Qashqai   PRINT ", ["b", "a"]) == make_cache_key("qashqai print", ["a", "b"])
+
+
+def test_shared_cache_versions_coexist_in_one_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old = SQLiteCache(path, version="old")
+    old.set("key", "old value")
+    new = SQLiteCache(path, version="new")
+    new.set("key", "new value")
+    # Connecting again, as a restarted worker of the old revision does, deletes nothing
+    assert SQLiteCache(path, version="old").get("key") == "old value"
+    assert new.get("key") == "new value"
+    new.clear()
+    assert (old.get("key"), new.get("key")) == ("old value", None)
+
+
+def test_expired_shared_entries_are_purged_on_connect(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    clock = FakeClock()
+    SQLiteCache(path, version="v", ttl=60, clock=clock).set("key", "value")
+    clock.now = 61
+    assert len(SQLiteCache(path, version="other", clock=clock)) == 0
+
+
+def test_shared_cache_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), version="v")
+    threads = []
+    for name in ("get", "set"):
+        original = getattr(cache, name)
+
+        def record(*args, original=original):
+            threads.append(threading.current_thread())
+            return original(*args)
+        monkeypatch.setattr(cache, name, record)
+
+    async def run():
+        cache.set_soon("key", [1, 2])
+        await asyncio.sleep(0.05)
+        return await cache.aget("key")
+
+    assert asyncio.run(run()) == [1, 2]
+    assert threads and threading.main_thread() not in threads
+
+
+def test_tiered_cache_copies_shared_hits_into_the_local_cache(tmp_path):
+    shared = SQLiteCache(str(tmp_path / "cache.sqlite"), version="v")
+    shared.set(("zero_shot", "key"), "scores")
+    tiered = TieredCache(TTLCache(maxsize=10), shared, "zero_shot")
+    assert asyncio.run(tiered.aget("key")) == "scores"
+    assert tiered.local.get("key") == "scores"
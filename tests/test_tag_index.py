@@ -0,0 +1,23 @@
+import time
+
+from app.data_files import load_car_models, load_tag_hierarchy
+from app.tag_index import TagIndex
+
+
+def index():
+    return TagIndex.from_hierarchy(load_tag_hierarchy(), load_car_models())
+
+
+def test_prefix_segment_and_fuzzy_matches():
+    tags = index()
+    assert tags.search("filter/vehicle/qash", "prefix") == ["filter/vehicle/qashqai"]
+    assert "filter/vehicle/qashqai" in tags.search("qash", "segment")
+    assert "filter/vehicle/qashqai" in tags.search("qashqia", "fuzzy")
+
+
+def test_long_fuzzy_queries_return_quickly():
+    tags = index()
+    start = time.perf_counter()
+    assert tags.search("q" * 200, "fuzzy") == []
+    assert tags.search("qashqai" * 28, "auto") == []
+    assert time.perf_counter() - start < 0.01
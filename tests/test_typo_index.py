@@ -0,0 +1,24 @@
+import time
+
+from app.typo_index import TypoIndex
+
+
+def test_corrects_typos_within_the_allowed_edits():
+    typos = TypoIndex(["qashqai", "juke", "x-trail"])
+    assert typos.correct("quashqai") == "qashqai"
+    assert typos.correct("qashqia") == "qashqai"
+    assert typos.correct("jkue") == "juke"
+    assert typos.correct("juk") is None
+
+
+def test_ambiguous_typos_are_not_corrected():
+    assert TypoIndex(["micra", "mixra"]).correct("mikra") is None
+
+
+def test_queries_too_long_for_any_word_are_not_expanded():
+    typos = TypoIndex(["qashqai", "juke"])
+    assert typos.max_query_length == len("qashqai") + 2
+    assert typos.candidates("qashqaixxx") == []
+    start = time.perf_counter()
+    assert typos.correct("q" * 400) is None
+    assert time.perf_counter() - start < 0.01